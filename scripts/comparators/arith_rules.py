@@ -0,0 +1,339 @@
+
+import re
+
+import numpy as np
+
+from parsers.columnar import ColumnarTable
+from comparators.column_mapper import ColumnMapper, UNIT_SCALES
+
+# Rules run by default; each name maps to a rule_<name> method of ArithmeticEngine.
+# Table rules get one TableView, cross-table rules get the list of all views of a document.
+TABLE_RULES = ['vertical', 'grouped', 'horizontal', 'percent_sum', 'share', 'change']
+CROSS_RULES = ['cross_table']
+
+AMOUNT_HEADER_WORDS = ["金额", "小计", "合计", "总计", "总价", "收入", "成本", "费用", "利润", "资产", "负债", "余额", "数量", "发生额"]
+NOT_SUMMABLE_WORDS = ["序号", "编号", "代码", "年份", "单价", "价格", "利率", "年龄", "期限", "率", "%", "占比", "比例", "变动", "增减"]
+PERCENT_HEADER_WORDS = ["%", "占比", "比例"]
+CHANGE_AMOUNT_WORDS = ["变动额", "变动金额", "增减额", "增减金额", "增减变动", "变动"]
+CHANGE_RATE_WORDS = ["变动率", "变动比例", "增长率", "增减率", "增减比例", "同比", "变动幅度", "增幅"]
+TOTAL_COLUMN_WORDS = ["小计", "合计", "总计"]
+LABEL_NOISE_RE = re.compile(r'^[\s一二三四五六七八九十\d、.．（）()]+|[：:\s]+$|合计$|总计$')
+YEAR_RE = re.compile(r'(?:19|20)\d{2}')
+
+# Line items that must carry the same figure wherever they are reported (cross_table rule).
+# Generic labels ("其他", "境内") are left out on purpose: they mean different things per table.
+CROSS_TABLE_SUBJECTS = {
+    "营业收入": "营业收入", "营业总收入": "营业收入", "主营业务收入": "主营业务收入",
+    "营业成本": "营业成本", "主营业务成本": "主营业务成本", "毛利": "毛利", "毛利润": "毛利",
+    "销售费用": "销售费用", "管理费用": "管理费用", "研发费用": "研发费用", "财务费用": "财务费用",
+    "营业利润": "营业利润", "利润总额": "利润总额", "净利润": "净利润",
+    "归属于母公司所有者的净利润": "归属于母公司所有者的净利润", "归属于母公司股东的净利润": "归属于母公司所有者的净利润",
+    "扣除非经常性损益后归属于母公司所有者的净利润": "扣非归母净利润", "扣除非经常性损益后归属于母公司股东的净利润": "扣非归母净利润",
+    "资产总计": "资产总额", "资产总额": "资产总额", "负债合计": "负债总额", "负债总额": "负债总额",
+    "所有者权益合计": "所有者权益", "股东权益合计": "所有者权益",
+    "货币资金": "货币资金", "应收账款": "应收账款", "存货": "存货", "固定资产": "固定资产",
+    "经营活动产生的现金流量净额": "经营活动现金流量净额",
+}
+
+def decimals(raw):
+    """
+    Most decimals shown in a column of cell strings (rounding granularity of the column).
+    """
+    best = 0
+    for v in raw:
+        dot = v.rfind('.')
+        if dot != -1:
+            digits = len(v) - dot - 1 - (1 if v.endswith('%') else 0)
+            if digits > best: best = digits
+    return best
+
+class TableView:
+    """
+    Everything the rules need about one table, derived once: the amount matrix (rows x summable
+    columns), row masks (total / subtotal / detail), column units and rounding granularities.
+    """
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+        self.cols = ColumnarTable.of(table)
+        headers = list(dict.fromkeys(table.get('headers', [])))
+        self.headers = headers
+        self.labels = self.cols.first
+        n = self.cols.n_rows
+
+        mapper = ColumnMapper()
+        self.units = {h: mapper.split_header(h)[1] for h in headers}
+        self.half_ulp = {h: 0.5 * 10 ** -decimals(self.cols.column(h)) for h in headers}
+
+        # Summable amount columns (the label column never is)
+        self.amount_cols = [h for h in headers[1:] if self.is_amount_column(h)]
+        self.matrix = np.column_stack([self.cols.column(h, 'amount') for h in self.amount_cols]) if self.amount_cols else np.empty((n, 0))
+
+        labels = self.labels
+        self.total = self.cols.total_mask()
+        self.subtotal = np.array(["小计" in v for v in labels], dtype=bool)
+        # "其中：境内" rows break down the row above; they are never added into sums
+        self.memo_rows = np.array([v.strip().startswith("其中") for v in labels], dtype=bool)
+        self.detail = ~(self.total | self.subtotal | self.memo_rows)
+
+    def is_amount_column(self, h):
+        if any(w in h for w in NOT_SUMMABLE_WORDS) and not any(w in h for w in TOTAL_COLUMN_WORDS):
+            return False
+        values = self.cols.column(h, 'amount')
+        filled = self.cols.column(h) != ""
+        if not filled.any(): return False
+        if any(w in h for w in AMOUNT_HEADER_WORDS): return True
+        # Headers without a keyword ("2023年度", "期末") count when nearly all cells are amounts
+        if YEAR_RE.fullmatch(h.strip()): return False # Column of years
+        return (~np.isnan(values) & filled).sum() >= 0.8 * filled.sum() and not np.isnan(values).all()
+
+    def scale(self, h):
+        # Multiplier from the column's display unit to 元
+        return UNIT_SCALES.get(self.units.get(h, ""), 1.0) if self.units.get(h) != '%' else 1.0
+
+    def label(self, i):
+        return self.labels[i] or f"第{i + 1}行"
+
+    def name(self):
+        return f"表{self.index + 1}"
+
+class ArithmeticEngine:
+    """
+    Rule-driven arithmetic verification over parsed tables:
+    - vertical: the last 合计 row equals the sum of detail rows above it
+    - grouped: every 小计 row equals the sum of detail rows since the previous subtotal
+    - horizontal: a 小计 / 合计 column equals the sum of the amount columns before it
+    - percent_sum: percentage columns add up to 100% (or 1)
+    - share: a 占比 column next to an amount column equals amount / total
+    - change: 变动额 / 变动率 columns agree with the two period columns before them
+    - cross_table: a key line item (营业收入, 净利润, ...) has the same value in every table that
+      reports it, compared in 元
+    Every rule works on whole columns at once. Tolerances follow the rounding the table shows
+    (half a unit of the last decimal per summed value), so a 万元 table with two decimals is held
+    to 0.005 万元 per value rather than a fixed 1.0.
+    """
+    def __init__(self, table_rules=None, cross_rules=None):
+        self.table_rules = TABLE_RULES if table_rules is None else table_rules
+        self.cross_rules = CROSS_RULES if cross_rules is None else cross_rules
+
+    def check_table(self, table, index=0):
+        if not table.get('rows'): return []
+        view = TableView(table, index)
+        issues = []
+        for name in self.table_rules:
+            issues.extend(getattr(self, f"rule_{name}")(view))
+        return issues
+
+    def check_tables(self, tables):
+        """
+        Cross-table rules over all tables of one document.
+        """
+        views = [TableView(t, i) for i, t in enumerate(tables) if t.get('rows')]
+        issues = []
+        for name in self.cross_rules:
+            issues.extend(getattr(self, f"rule_{name}")(views))
+        return issues
+
+    def fmt(self, v):
+        return f"{v:,.2f}"
+
+    # --- Table rules ---
+
+    def rule_vertical(self, view):
+        issues = []
+        total_idx = np.flatnonzero(view.total)
+        if not len(total_idx) or not view.amount_cols: return issues
+        t = int(total_idx[-1])
+        rows = view.detail.copy()
+        rows[t:] = False
+
+        m = view.matrix
+        declared = m[t]
+        calc = np.nansum(m[rows], axis=0)
+        counts = (~np.isnan(m[rows])).sum(axis=0)
+        tol = np.array([(c + 1) * view.half_ulp[h] for c, h in zip(counts, view.amount_cols)]) + 1e-9
+        bad = ~np.isnan(declared) & (declared != 0) & (counts > 0) & (np.abs(declared - calc) > tol)
+        for k in np.flatnonzero(bad):
+            h = view.amount_cols[k]
+            diff = abs(declared[k] - calc[k])
+            issues.append(f"合计行验算失败 (列: {h}): 表格显示 {self.fmt(declared[k])}, 计算得出 {calc[k]:.2f} (差 {diff:.2f})")
+        return issues
+
+    def rule_grouped(self, view):
+        issues = []
+        boundaries = np.flatnonzero(view.subtotal)
+        if not len(boundaries) or not view.amount_cols: return issues
+
+        # Prefix sums of detail rows: a group sum is a difference of two prefix rows
+        m = view.matrix
+        detail_values = np.where(view.detail[:, None], np.nan_to_num(m), 0.0)
+        prefix = np.vstack([np.zeros(m.shape[1]), np.cumsum(detail_values, axis=0)])
+        detail_counts = np.vstack([np.zeros(m.shape[1]), np.cumsum(view.detail[:, None] & ~np.isnan(m), axis=0)])
+
+        start = 0
+        for b in boundaries:
+            b = int(b)
+            calc = prefix[b] - prefix[start]
+            counts = detail_counts[b] - detail_counts[start]
+            declared = m[b]
+            tol = np.array([(c + 1) * view.half_ulp[h] for c, h in zip(counts, view.amount_cols)]) + 1e-9
+            bad = ~np.isnan(declared) & (counts > 0) & (np.abs(declared - calc) > tol)
+            for k in np.flatnonzero(bad):
+                issues.append(f"小计行验算失败 (列: {view.amount_cols[k]}, 行: {view.label(b)}): 表格显示 {self.fmt(declared[k])}, 计算得出 {calc[k]:.2f}")
+            start = b + 1
+        return issues
+
+    def rule_horizontal(self, view):
+        issues = []
+        cols = view.amount_cols
+        group = []
+        for k, h in enumerate(cols):
+            if not any(w in h for w in TOTAL_COLUMN_WORDS):
+                group.append(k)
+                continue
+            if len(group) >= 2:
+                m = view.matrix
+                members = m[:, group]
+                calc = np.nansum(members, axis=1)
+                present = (~np.isnan(members)).sum(axis=1)
+                declared = m[:, k]
+                tol = (len(group) + 1) * max(view.half_ulp[cols[g]] for g in group + [k]) + 1e-9
+                bad = ~np.isnan(declared) & (present > 0) & (np.abs(declared - calc) > tol)
+                for i in np.flatnonzero(bad):
+                    issues.append(f"横向小计验算失败 (行: {view.label(i)}, 列: {h}): 表格显示 {self.fmt(declared[i])}, 计算得出 {calc[i]:.2f}")
+            group = []
+        return issues
+
+    def rule_percent_sum(self, view):
+        issues = []
+        data_rows = view.detail
+        for h in view.headers:
+            if not any(w in h for w in PERCENT_HEADER_WORDS): continue
+            values = view.cols.column(h, 'percent')[data_rows]
+            present = ~np.isnan(values)
+            count = int(present.sum())
+            col_sum = float(values[present].sum())
+            if count <= 1 or col_sum <= 0: continue
+            # Expect sum to be approx 100 or 1.0
+            if 99.0 <= col_sum <= 101.0 or 0.99 <= col_sum <= 1.01: continue
+            issues.append(f"百分比验算异常 (列: {h}): 总和为 {col_sum:.2f} (预期 100% 或 1)")
+        return issues
+
+    def rule_share(self, view):
+        issues = []
+        headers = view.headers
+        for p, h in enumerate(headers):
+            if p == 0 or not any(w in h for w in ["占比", "比例"]): continue
+            base = headers[p - 1]
+            if base not in view.amount_cols: continue
+
+            amounts = view.cols.column(base, 'amount')
+            shares = view.cols.column(h, 'percent')
+            total_idx = np.flatnonzero(view.total)
+            total = amounts[int(total_idx[-1])] if len(total_idx) else np.nansum(amounts[view.detail])
+            if np.isnan(total) or total == 0: continue
+
+            rows = view.detail & ~np.isnan(amounts) & ~np.isnan(shares)
+            if rows.sum() < 2: continue
+            calc = amounts / total * 100
+            # Shares written as fractions (0.35) instead of percents (35)
+            if np.nansum(shares[view.detail]) <= 1.5: calc = calc / 100
+            tol = 2 * view.half_ulp[h] + 1e-9
+            bad = rows & (np.abs(shares - calc) > tol)
+            for i in np.flatnonzero(bad):
+                issues.append(f"占比验算失败 (行: {view.label(i)}, 列: {h}): 表格显示 {view.cols.column(h)[i]}, 按 '{base}' 计算为 {calc[i]:.2f}")
+        return issues
+
+    def rule_change(self, view):
+        issues = []
+        headers = view.headers
+        for p, h in enumerate(headers):
+            is_rate = any(w in h for w in CHANGE_RATE_WORDS)
+            is_amount = not is_rate and any(w in h for w in CHANGE_AMOUNT_WORDS)
+            if not is_rate and not is_amount: continue
+
+            # The two period columns right before the change columns
+            periods = [c for c in headers[:p] if c in view.amount_cols and not any(w in c for w in TOTAL_COLUMN_WORDS)][-2:]
+            if len(periods) < 2: continue
+            cur, prev = periods
+            y1, y2 = YEAR_RE.search(cur), YEAR_RE.search(prev)
+            if y1 and y2 and y1.group(0) < y2.group(0): cur, prev = prev, cur
+
+            a = view.cols.column(cur, 'amount')
+            b = view.cols.column(prev, 'amount')
+            if is_rate:
+                declared = view.cols.column(h, 'percent')
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    calc = (a - b) / np.abs(b) * 100
+                tol = 2 * view.half_ulp[h] + 0.01
+                valid = ~np.isnan(declared) & ~np.isnan(calc) & np.isfinite(calc)
+            else:
+                declared = view.cols.column(h, 'amount')
+                calc = a - b
+                tol = view.half_ulp[cur] + view.half_ulp[prev] + view.half_ulp[h] + 1e-9
+                valid = ~np.isnan(declared) & ~np.isnan(calc)
+            # Accept either sign convention of the change column
+            bad = valid & (np.abs(declared - calc) > tol) & (np.abs(declared + calc) > tol)
+            kind = "变动率" if is_rate else "变动额"
+            for i in np.flatnonzero(bad):
+                issues.append(f"{kind}验算失败 (行: {view.label(i)}, 列: {h}): 表格显示 {view.cols.column(h)[i]}, 按 '{cur}' 与 '{prev}' 计算为 {calc[i]:.2f}")
+        return issues
+
+    # --- Cross-table rules ---
+
+    def subject(self, view, i):
+        """
+        Which tracked line item a row reports ('' for none): its label without numbering and a
+        trailing 合计; a bare 合计 row reports the table's subject (its first header, e.g. 营业收入构成).
+        """
+        label = LABEL_NOISE_RE.sub('', view.labels[i].replace(' ', ''))
+        if not label and view.total[i] and view.headers:
+            label = LABEL_NOISE_RE.sub('', view.headers[0].replace(' ', ''))
+            label = re.sub(r'(构成|明细|情况|分类)$', '', label)
+        return CROSS_TABLE_SUBJECTS.get(label, "")
+
+    def period(self, h):
+        # "2023年度" / "2023年12月31日" / "2023.12.31" -> digits; other headers by name
+        name = ColumnMapper().split_header(h)[0]
+        if YEAR_RE.search(name):
+            return re.sub(r'\D', '', name)
+        return re.sub(r'(金额|数额)$', '', name)
+
+    def rule_cross_table(self, views):
+        # (subject, period) -> [(view, row, value in 元, tolerance in 元, header)], one entry per table
+        index = {}
+        for view in views:
+            seen = {}
+            for i in range(len(view.labels)):
+                if view.memo_rows[i]: continue
+                subj = self.subject(view, i)
+                if not subj: continue
+                seen[subj] = None if subj in seen else i # Labels repeated in one table are ambiguous
+            for subj, i in seen.items():
+                if i is None: continue
+                for k, h in enumerate(view.amount_cols):
+                    v = view.matrix[i, k]
+                    if np.isnan(v): continue
+                    scale = view.scale(h)
+                    index.setdefault((subj, self.period(h)), []).append((view, i, v * scale, view.half_ulp[h] * scale, h))
+
+        issues = []
+        for (subj, period), facts in index.items():
+            if len(facts) < 2: continue
+            values = np.array([f[2] for f in facts])
+            tols = np.array([f[3] for f in facts])
+            ref = 0
+            diff = np.abs(values - values[ref])
+            bad = diff > tols + tols[ref] + 1e-6
+            # A 10^4 / 10^8 ratio means the unit was only given in a caption (万元 vs 元), not a conflict
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.abs(values / values[ref]) if values[ref] else np.zeros(len(values))
+            for unit in (1e4, 1e8):
+                bad &= ~(np.isclose(ratio, unit, rtol=1e-3) | np.isclose(ratio, 1 / unit, rtol=1e-3))
+            for k in np.flatnonzero(bad):
+                v1, v2 = facts[ref], facts[k]
+                issues.append(
+                    f"跨表数据不一致: '{subj}' ({period}) {v1[0].name()} '{v1[4]}' 为 {v1[0].cols.column(v1[4])[v1[1]]}, "
+                    f"{v2[0].name()} '{v2[4]}' 为 {v2[0].cols.column(v2[4])[v2[1]]}"
+                )
+        return issues
@@ -0,0 +1,116 @@
+
+import re
+import difflib
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from parsers.columnar import ColumnarTable
+from utils.assignment import solve_assignment
+
+# Unit suffixes recognised in headers, with their scale relative to 元
+UNIT_SCALES = {'元': 1.0, '千元': 1e3, '万元': 1e4, '百万元': 1e6, '亿元': 1e8, '%': 1.0}
+UNIT_RE = re.compile(r'[(\[]\s*(?:单位[:：]?)?\s*(千元|万元|百万元|亿元|元|%)\s*[)\]]$|(千元|万元|百万元|亿元|%)$')
+
+class ColumnMapper:
+    """
+    Maps the columns of a file-1 table to the columns of its matched file-2 table.
+    Headers are normalized (full-width -> half-width, whitespace, unit suffix split off), then
+    scored by name similarity and by how alike the column values look, and assigned one-to-one.
+    Mappings are cached per (header signature 1, header signature 2), so repeated table shapes
+    in a batch run are only mapped once.
+    """
+    NAME_WEIGHT = 0.7
+    VALUE_WEIGHT = 0.3
+    MIN_SCORE = 0.5
+
+    _cache = OrderedDict()
+    _cache_size = 1024
+
+    def split_header(self, h):
+        """
+        Returns (normalized name, unit or '').
+        """
+        h = unicodedata.normalize('NFKC', h or "")
+        h = re.sub(r'\s+', '', h)
+        m = UNIT_RE.search(h)
+        if not m: return h, ""
+        unit = m.group(1) or m.group(2)
+        return h[:m.start()], unit
+
+    def name_similarity(self, a, b):
+        if a == b: return 1.0
+        if not a or not b: return 0.0
+        # "合同金额" vs "金额": one name qualifies the other
+        if a in b or b in a: return 0.8
+        return difflib.SequenceMatcher(None, a, b).ratio()
+
+    def value_profile(self, cols, h):
+        """
+        Share of amounts / percents / dates / other among non-empty cells, plus a sample of values.
+        """
+        raw = cols.column(h)
+        filled = raw != ""
+        n = max(int(filled.sum()), 1)
+        is_amount = ~np.isnan(cols.column(h, 'amount')) & filled
+        is_percent = np.array([v.endswith('%') for v in raw], dtype=bool) & filled
+        is_date = ~np.isnat(cols.column(h, 'date')) & filled
+        mix = np.array([is_amount.sum(), is_percent.sum(), is_date.sum(), 0.0]) / n
+        mix[3] = max(0.0, 1.0 - mix[:3].sum())
+        return mix, set(raw[filled][:200])
+
+    def value_similarity(self, p1, p2):
+        mix1, vals1 = p1
+        mix2, vals2 = p2
+        type_sim = float(np.minimum(mix1, mix2).sum())
+        if vals1 and vals2 and mix1[3] > 0.5 and mix2[3] > 0.5:
+            # Text columns: how many values they share
+            overlap = len(vals1 & vals2) / len(vals1 | vals2)
+            return 0.5 * type_sim + 0.5 * overlap
+        return type_sim
+
+    def map_columns(self, t1, t2):
+        """
+        Returns (pairs, unmapped1, unmapped2); pairs = [(h1, h2, scale)] where scale converts
+        file-2 amounts into file-1 units (e.g. 元 -> 万元 is 0.0001).
+        """
+        key = (tuple(t1['headers']), tuple(t2['headers']))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        h1 = list(dict.fromkeys(t1['headers']))
+        h2 = list(dict.fromkeys(t2['headers']))
+        split1 = [self.split_header(h) for h in h1]
+        split2 = [self.split_header(h) for h in h2]
+        c1 = ColumnarTable.of(t1)
+        c2 = ColumnarTable.of(t2)
+        prof1 = [self.value_profile(c1, h) for h in h1]
+        prof2 = [self.value_profile(c2, h) for h in h2]
+
+        scores = {}
+        for i, (n1, _) in enumerate(split1):
+            for j, (n2, _) in enumerate(split2):
+                name_sim = self.name_similarity(n1, n2)
+                if name_sim < 0.4: continue
+                score = self.NAME_WEIGHT * name_sim + self.VALUE_WEIGHT * self.value_similarity(prof1[i], prof2[j])
+                if score >= self.MIN_SCORE:
+                    scores[(i, j)] = score
+
+        pairs = []
+        for i, j, _ in solve_assignment(scores):
+            u1, u2 = split1[i][1], split2[j][1]
+            scale = 1.0
+            if u1 in UNIT_SCALES and u2 in UNIT_SCALES and u1 != '%' and u2 != '%':
+                scale = UNIT_SCALES[u2] / UNIT_SCALES[u1]
+            pairs.append((h1[i], h2[j], scale))
+        mapped1 = {p[0] for p in pairs}
+        mapped2 = {p[1] for p in pairs}
+        result = (pairs, [h for h in h1 if h not in mapped1], [h for h in h2 if h not in mapped2])
+
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
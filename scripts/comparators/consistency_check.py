@@ -1,78 +1,75 @@
 
 import re
-import subprocess
 
-class ConsistencyChecker:
-    def check_file(self, file_path):
-        issues = []
-        
-        # 1. Get Text Content
-        try:
-           # We need textutil for reliable extraction
-           res = subprocess.run(['textutil', '-convert', 'txt', '-stdout', file_path], capture_output=True, text=True)
-           text = res.stdout
-        except:
-            return ["无法读取文件进行一致性检查"]
-            
-        # 2. Extract Section Headers (e.g., "1.1", "第一条", "（一）")
-        # Creating a set of existing sections for verification
-        existing_sections = set()
-        
-        # Regex for common section headers
-        # 1.1, 1.2.3
-        sections_num = re.findall(r'^\s*(\d+(\.\d+)+)\s', text, re.MULTILINE)
-        for s in sections_num: existing_sections.add(s[0])
-        
-        # 第一条，第二条
-        sections_cn = re.findall(r'^\s*(第[一二三四五六七八九十百]+条)', text, re.MULTILINE)
-        for s in sections_cn: existing_sections.add(s)
+from utils.aho_corasick import AhoCorasick
 
-        # 3. Reference Check (Broken Links)
-        # Find "见第X.X条", "根据第X条"
-        # Supports "第1.2条", "第1.2款"
-        refs = re.findall(r'(见|如|根据|遵照)(第\s*(\d+(\.\d+)+)\s*[条款])', text)
-        for match in refs:
-            full_ref = match[1]
-            ref_num = match[2]
-            
-            # Verify if ref_num exists in headers
-            # Fuzzy check: exact match or match with trailing dot?
-            if ref_num not in existing_sections:
-                # Might be false positive if section header format differs (e.g. "1.2 Title")
-                # We do a second pass check: is "1.2" at the start of any line?
-                if not re.search(fr'^\s*{re.escape(ref_num)}', text, re.MULTILINE):
-                    issues.append(f"引用可能断链: 文中引用了 '{full_ref}'，但未找到对应的章节标题 '{ref_num}'")
+# References ("见第1.2条", "根据第1.2款") and definitions (“DefinedTerm”（以下简称“ShortTerm”）) in one pattern
+SCAN_RE = re.compile(
+    r'(?:见|如|根据|遵照)(?P<ref>第\s*(?P<ref_num>\d+(?:\.\d+)+)\s*[条款])'
+    r'|“(?P<full>[^”]+)”\s*[（(]以下简称[“"\'\s]*(?P<short>[^”"\'\)]+)[”"\'\s]*[)）]'
+)
 
-        # 4. Definition Check
-        # Pattern: “DefinedTerm”（以下简称“ShortTerm”）
-        # Or: "Full Name" (the "Short Name")
-        defs = re.findall(r'“([^”]+)”\s*[（(]以下简称[“"\'\s]*([^”"\'\)]+)[”"\'\s]*[)）]', text)
-        
-        defined_map = {}
-        for full, short in defs:
+class ConsistencyChecker:
+    """
+    Reference and definition checks in two linear passes over the text:
+    1. one combined regex pass collects references and definitions;
+    2. one Aho-Corasick pass over the referenced section numbers and the defined full names.
+       A reference resolves when its number starts a line (checked against the line-start index);
+       full names found after their definition are counted.
+    """
+    def check(self, ctx):
+        """
+        ctx: DocumentContext built once per file.
+        """
+        text = ctx.text
+
+        # 1. References and definitions
+        refs = []          # (full_ref, ref_num), in document order
+        defined_map = {}   # short -> full (last definition wins)
+        def_end = {}       # short -> end offset of its first definition
+        dup_issues = []
+        for m in SCAN_RE.finditer(text):
+            if m.group('ref'):
+                refs.append((m.group('ref'), m.group('ref_num')))
+                continue
+            full, short = m.group('full'), m.group('short')
             if short in defined_map:
-                issues.append(f"重复定义: 简称 '{short}' 被多次定义")
+                dup_issues.append(f"重复定义: 简称 '{short}' 被多次定义")
             defined_map[short] = full
-            
-        # Check usage of Full Name where Short Name exists? (Efficiency check)
-        # Or check if Short Name is used before definition? (Harder)
-        # Let's check for "Undefind Term" look-alikes? 
-        # Better: Check if user uses "Full Name" significantly after defining "Short Name".
-        
+            def_end.setdefault(short, m.end())
+
+        # Full names worth suggesting the short form for; a full name may have several shorts
+        watched = {}
+        for short, full in defined_map.items():
+            if len(full) > 4: watched.setdefault(full, []).append(short)
+
+        # 2. One automaton pass
+        ref_nums = {num for _, num in refs}
+        resolved = set()
+        after_def = {}     # full -> [(start, end)] of non-overlapping occurrences
+        offsets = ctx.line_offsets
+        for start, end, p in AhoCorasick(list(ref_nums) + list(watched)).iter(text):
+            if p in ref_nums and p not in resolved:
+                # Section header: only whitespace between the line start and the number
+                line_start = offsets[ctx.line_of(start)]
+                if not text[line_start:start].strip():
+                    resolved.add(p)
+            if p in watched:
+                spans = after_def.setdefault(p, [])
+                if not spans or start >= spans[-1][1]:
+                    spans.append((start, end))
+
+        issues = []
+        for full_ref, ref_num in refs:
+            if ref_num not in resolved:
+                issues.append(f"引用可能断链: 文中引用了 '{full_ref}'，但未找到对应的章节标题 '{ref_num}'")
+        issues.extend(dup_issues)
+
+        # Full name still used after the short name was defined
         for short, full in defined_map.items():
-            # Find definition index
-            def_match = re.search(fr'以下简称[“"\'\s]*{re.escape(short)}', text)
-            if not def_match: continue
-            
-            def_idx = def_match.end()
-            remainder = text[def_idx:]
-            
-            # If Full Name appears in remainder, suggest using Short Name
-            # Be careful of "Title" or specialized usage.
-            if len(full) > 4 and full in remainder:
-                 # count occurrences
-                 count = remainder.count(full)
-                 if count > 0:
-                     issues.append(f"定义一致性建议: 已定义简称 '{short}'，但在后文仍使用了全称 '{full}' {count} 次")
+            if full not in watched: continue
+            count = sum(1 for start, _ in after_def.get(full, []) if start >= def_end[short])
+            if count > 0:
+                issues.append(f"定义一致性建议: 已定义简称 '{short}'，但在后文仍使用了全称 '{full}' {count} 次")
 
         return issues
@@ -0,0 +1,162 @@
+
+import re
+import unicodedata
+
+from parsers.section_chunker import prose_text
+
+CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '壹': 1, '二': 2, '贰': 2, '两': 2, '三': 3, '叁': 3, '四': 4, '肆': 4,
+             '五': 5, '伍': 5, '六': 6, '陆': 6, '七': 7, '柒': 7, '八': 8, '捌': 8, '九': 9, '玖': 9}
+CN_UNITS = {'十': 10, '拾': 10, '百': 100, '佰': 100, '千': 1000, '仟': 1000}
+CN_SECTIONS = {'万': 10 ** 4, '亿': 10 ** 8}
+
+# Scale to the canonical unit, and the kind of quantity
+UNITS = {
+    '元': (1, 'money'), '千元': (1e3, 'money'), '万元': (1e4, 'money'), '百万元': (1e6, 'money'), '亿元': (1e8, 'money'),
+    '股': (1, 'shares'), '万股': (1e4, 'shares'), '亿股': (1e8, 'shares'),
+    '%': (1, 'percent'), '％': (1, 'percent'),
+    '万': (1e4, 'number'), '亿': (1e8, 'number'),
+}
+MEASURES = "人|名|项|家|个|次|户|台|套|件|份|辆|平方米|亩|天|年|个月"
+
+CN_NUM = r'[零〇一二三四五六七八九十百千万亿两壹贰叁肆伍陆柒捌玖拾佰仟]+'
+CN_DATE_DIGIT = r'[〇零一二三四五六七八九]'
+CN_SMALL = r'[一二三四五六七八九十]{1,3}'
+
+# One scanner for every entity kind; the first alternative that matches at a position wins
+ENTITY_RE = re.compile(
+    r'(?P<date>(?P<y>(?:19|20)\d{2})\s*(?:年\s*(?P<m>\d{1,2})\s*月(?:\s*(?P<d>\d{1,2})\s*日)?|(?P<sep>[.\-/])(?P<m2>\d{1,2})(?P=sep)(?P<d2>\d{1,2})(?!\d)))'
+    r'|(?P<cndate>' + CN_DATE_DIGIT + r'{4}年' + CN_SMALL + r'月(?:' + CN_SMALL + r'日)?)'
+    r'|(?P<ord>第\s*(?:\d+(?:\.\d+)*|' + CN_NUM + r'))'
+    r'|(?P<num>-?\d[\d,，]*(?:\.\d+)?)\s*(?P<unit>百万元|千元|万元|亿元|元|万股|亿股|股|%|％|万|亿)?(?P<measure>' + MEASURES + r')?'
+    r'|(?P<cnnum>' + CN_NUM + r')(?P<cnunit>百万元|千元|万元|亿元|元|万股|亿股|股)'
+)
+
+KEY_NOISE_RE = re.compile(r'(?:为|是|约|达|达到|共|共计|合计|计|至|了|于|的|由|从|增至|降至|人民币|：|:)+$')
+CLAUSE_RE = re.compile(r'[。；;，,！？\n\t、（）()]')
+
+def parse_cn_number(s):
+    """
+    Chinese numerals ("五千万", "一亿二千万", "三十五") -> int, or None.
+    """
+    total, section, digit = 0, 0, 0
+    for ch in s:
+        if ch in CN_DIGITS:
+            digit = CN_DIGITS[ch]
+        elif ch in CN_UNITS:
+            section += (digit or 1) * CN_UNITS[ch]
+            digit = 0
+        elif ch in CN_SECTIONS:
+            section += digit
+            if CN_SECTIONS[ch] == 10 ** 8:
+                total = (total + section) * 10 ** 8
+            else:
+                total += section * 10 ** 4
+            section, digit = 0, 0
+        else:
+            return None
+    return total + section + digit
+
+class EntityDiffer:
+    """
+    Figures and dates written in prose, compared across aligned sections.
+    Each section text is scanned once with ENTITY_RE; every amount, share count, percentage,
+    count and date is normalized (元 / 股 scaling, Chinese numerals, ISO dates) and keyed by the
+    words right before it in the same clause ("注册资本为5,000万元" -> 注册资本). Keys found the
+    same number of times on both sides are paired in order; differing canonical values are
+    conflicts. Keys with different counts are ambiguous and left to the text diff.
+    Figures inside table rows (the entry's table_rows_a / table_rows_b) are left to the table comparison.
+    """
+    KEY_CHARS = 8
+
+    def diff_aligned(self, aligned, text_diffs, state=None):
+        """
+        Only sections the text diff reported as modified can hold a conflict.
+        Returns [{'section', 'key', 'kind', 'a', 'b'}].
+        """
+        conflicts = []
+        for d in text_diffs:
+            if d['status'] != 'modified': continue
+            s = aligned[d['index']]
+            text_a, text_b = prose_text(s.get('text_a', ''), s.get('table_rows_a')), prose_text(s.get('text_b', ''), s.get('table_rows_b'))
+            if state:
+                found = state.memo('entity_diff', [text_a, text_b], lambda: self.diff_texts(text_a, text_b))
+            else:
+                found = self.diff_texts(text_a, text_b)
+            conflicts.extend(dict(c, section=s['section']) for c in found)
+        return conflicts
+
+    def diff_texts(self, text_a, text_b):
+        ents_a = self.extract(text_a)
+        ents_b = self.extract(text_b)
+        conflicts = []
+        for k, items_a in ents_a.items():
+            items_b = ents_b.get(k)
+            if not items_b or len(items_a) != len(items_b): continue
+            for (raw_a, val_a), (raw_b, val_b) in zip(items_a, items_b):
+                if not self.same(val_a, val_b):
+                    conflicts.append({'key': k[1], 'kind': k[0], 'a': raw_a, 'b': raw_b})
+        return conflicts
+
+    def same(self, v1, v2):
+        if isinstance(v1, float) and isinstance(v2, float):
+            return abs(v1 - v2) <= 1e-6 * max(1.0, abs(v1), abs(v2))
+        return v1 == v2
+
+    def extract(self, text):
+        """
+        Returns {(kind, key): [(raw, canonical value)]} in text order.
+        """
+        text = unicodedata.normalize('NFKC', text or "")
+        found = {}
+        for m in ENTITY_RE.finditer(text):
+            if m.group('ord'): continue # 第3条 / 第一节: ordinals, not figures
+            start = m.start()
+            entity = self.canonical(m)
+            if entity is None: continue
+            kind, value = entity
+            key = self.context_key(text, start, m.end())
+            if not key: continue
+            found.setdefault((kind, key), []).append((m.group(0).strip(), value))
+        return found
+
+    def canonical(self, m):
+        if m.group('date'):
+            y = m.group('y')
+            mo = m.group('m') or m.group('m2')
+            d = m.group('d') or m.group('d2')
+            if not 1 <= int(mo) <= 12: return None
+            return ('date', f"{y}-{mo.zfill(2)}-{d.zfill(2)}" if d else f"{y}-{mo.zfill(2)}")
+        if m.group('cndate'):
+            y, rest = m.group('cndate').split('年', 1)
+            year = "".join(str(CN_DIGITS[c]) for c in y)
+            mo, _, d = rest.partition('月')
+            mo = parse_cn_number(mo)
+            d = parse_cn_number(d.rstrip('日')) if d else None
+            return ('date', f"{year}-{mo:02d}-{d:02d}" if d else f"{year}-{mo:02d}")
+        if m.group('cnnum'):
+            n = parse_cn_number(m.group('cnnum'))
+            if n is None: return None
+            scale, kind = UNITS[m.group('cnunit')]
+            return (kind, float(n * scale))
+
+        num = float(m.group('num').replace(',', '').replace('，', ''))
+        unit = m.group('unit')
+        if unit:
+            scale, kind = UNITS[unit]
+            value = num * scale
+            if kind == 'number' and m.group('measure'):
+                kind = f"number:{m.group('measure')}"
+            return (kind, float(value))
+        if m.group('measure'):
+            return (f"number:{m.group('measure')}", num)
+        return ('number', num)
+
+    def context_key(self, text, start, end):
+        # Words before the figure in the same clause; failing that, the words right after it
+        before = CLAUSE_RE.split(text[max(0, start - 30):start])[-1]
+        before = re.sub(r'[^\u4e00-\u9fa5A-Za-z]', '', before)
+        key = KEY_NOISE_RE.sub('', before)[-self.KEY_CHARS:]
+        if len(key) >= 2: return key
+        after = CLAUSE_RE.split(text[end:end + 20])[0]
+        after = re.sub(r'[^\u4e00-\u9fa5A-Za-z]', '', after)[:self.KEY_CHARS // 2]
+        return f"{key}…{after}" if len(after) >= 2 else ""
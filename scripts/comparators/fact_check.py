@@ -0,0 +1,151 @@
+
+import re
+import difflib
+import unicodedata
+
+# Declarative fact patterns. Each entry:
+# - kind: fact family; facts are joined across files on (kind, key)
+# - pattern: regex with named groups 'key' and 'value' (compiled into one combined scanner)
+# - norm: how values are normalized before comparing ('text', 'shares', 'money', 'date')
+# - aliases: key spellings folded onto one canonical key
+# - split: separator for keys listing several names ("发行人、公司、本公司")
+# - label: issue label, formatted with the key
+# Add an entry here to track a new kind of fact.
+FACT_PATTERNS = [
+    {
+        'kind': 'definition',
+        'pattern': r'“(?P<value>[^”\n]{2,60})”\s*[（(]以下简称[“"\'\s]*(?P<key>[^”"\'\)\n]{1,20})',
+        'norm': 'text',
+        'label': "释义 '{key}'",
+    },
+    {
+        # Definitions table (释义): "发行人、公司、本公司    指    北京某某科技股份有限公司"
+        'kind': 'definition',
+        'pattern': r'^(?P<key>[^\n\t指]{1,40}?)[ \t]+指[ \t]+(?P<value>[^\n\t]{2,120})$',
+        'norm': 'text',
+        'split': '、',
+        'label': "释义 '{key}'",
+    },
+    {
+        'kind': 'entity',
+        'pattern': r'(?P<key>实际控制人|实控人|控股股东)(?:为|是|：|:)?\s*(?P<value>[\u4e00-\u9fa5]{2,10})',
+        'norm': 'text',
+        'aliases': {'实控人': '实际控制人'},
+        'label': '{key}',
+    },
+    {
+        'kind': 'shares',
+        'pattern': r'(?P<key>总股本|股本总额|本次(?:公开)?发行(?:股票|股份)?(?:数量|股数))(?:为|是|：|:|不超过)?\s*(?P<value>\d[\d,，]*(?:\.\d+)?\s*(?:万股|亿股|股))',
+        'norm': 'shares',
+        'aliases': {'股本总额': '总股本'},
+        'label': '{key}',
+    },
+    {
+        'kind': 'capital',
+        'pattern': r'(?P<key>注册资本|实收资本)(?:为|是|：|:)?\s*(?:人民币)?\s*(?P<value>\d[\d,，]*(?:\.\d+)?\s*(?:万元|亿元|元))',
+        'norm': 'money',
+        'label': '{key}',
+    },
+    {
+        'kind': 'date',
+        'pattern': r'(?P<key>成立日期|设立日期|成立时间|股份公司设立日期)(?:为|是|：|:)?\s*(?P<value>\d{4}\s*年\s*\d{1,2}\s*月\s*\d{1,2}\s*日)',
+        'norm': 'date',
+        'aliases': {'设立日期': '成立日期', '成立时间': '成立日期'},
+        'label': '{key}',
+    },
+]
+
+UNIT_SCALES = {'股': 1, '万股': 10000, '亿股': 100000000, '元': 1, '万元': 10000, '亿元': 100000000}
+
+def build_scanner(patterns):
+    """
+    Compiles every registry pattern into one alternation, so the text is scanned once.
+    Group names are made unique per entry: 'key' -> 'k3', 'value' -> 'v3', whole entry -> 'f3'.
+    """
+    parts = []
+    for i, p in enumerate(patterns):
+        rx = p['pattern'].replace('(?P<key>', f'(?P<k{i}>').replace('(?P<value>', f'(?P<v{i}>')
+        parts.append(f'(?P<f{i}>{rx})')
+    return re.compile('|'.join(parts), re.MULTILINE)
+
+class FactChecker:
+    """
+    Cross-document fact reconciliation.
+    Both texts are scanned once with the combined registry pattern into fact tables indexed by
+    (kind, key); the two tables are then joined and a conflict is reported for every key whose
+    normalized values in the two files have nothing in common.
+    """
+    def __init__(self, patterns=None, similarity=None):
+        self.patterns = patterns or FACT_PATTERNS
+        self.scanner = build_scanner(self.patterns)
+        # Text facts count as equal above this similarity (e.g. jieba token Jaccard)
+        self.similarity = similarity or (lambda a, b: difflib.SequenceMatcher(None, a, b).ratio())
+        self.min_similarity = 0.8
+
+    def normalize(self, value, norm):
+        value = unicodedata.normalize('NFKC', value)
+        value = re.sub(r'\s+', '', value)
+        if norm in ('shares', 'money'):
+            m = re.match(r'([\d,，]+(?:\.\d+)?)(.*)$', value)
+            if not m: return value
+            num = float(m.group(1).replace(',', '').replace('，', ''))
+            return round(num * UNIT_SCALES.get(m.group(2), 1), 2)
+        if norm == 'date':
+            m = re.match(r'(\d{4})年(\d{1,2})月(\d{1,2})日', value)
+            if m: return f"{m.group(1)}-{m.group(2).zfill(2)}-{m.group(3).zfill(2)}"
+        return value.strip('“”"\'。，,；;')
+
+    def extract(self, text):
+        """
+        Returns {(kind, key): [(raw value, normalized value, offset)]} in document order.
+        """
+        facts = {}
+        for m in self.scanner.finditer(text):
+            i = int(m.lastgroup[1:])
+            p = self.patterns[i]
+            raw_key = re.sub(r'\s+', '', m.group(f'k{i}'))
+            value = m.group(f'v{i}').strip()
+            keys = raw_key.split(p['split']) if p.get('split') else [raw_key]
+            norm = self.normalize(value, p['norm'])
+            for key in keys:
+                if not key: continue
+                key = p.get('aliases', {}).get(key, key)
+                facts.setdefault((p['kind'], key), []).append((value, norm, m.start()))
+        return facts
+
+    def label(self, kind, key):
+        for p in self.patterns:
+            if p['kind'] == kind:
+                return p['label'].format(key=key)
+        return key
+
+    def same(self, kind, v1, v2):
+        if v1 == v2: return True
+        # Names of people / shareholders may be written loosely; definitions must match exactly
+        if isinstance(v1, str) and isinstance(v2, str) and kind == 'entity':
+            return self.similarity(v1, v2) >= self.min_similarity
+        return False
+
+    def compare(self, ctx1, ctx2):
+        """
+        Returns issue strings for facts that disagree between the two documents.
+        """
+        facts1 = self.extract(ctx1.text)
+        facts2 = self.extract(ctx2.text)
+
+        issues = []
+        for fkey in facts1:
+            if fkey not in facts2: continue
+            vals1, vals2 = facts1[fkey], facts2[fkey]
+            norms2 = {n for _, n, _ in vals2}
+            if any(n1 in norms2 for _, n1, _ in vals1): continue
+            if any(self.same(fkey[0], n1, n2) for _, n1, _ in vals1 for n2 in norms2): continue
+
+            # Report the first statement of the fact in each file
+            v1, _, off1 = vals1[0]
+            v2, _, off2 = vals2[0]
+            issues.append(
+                f"⚠️ {self.label(*fkey)} 不一致: {ctx1.name}='{v1}' (第{ctx1.line_of(off1) + 1}行) "
+                f"vs {ctx2.name}='{v2}' (第{ctx2.line_of(off2) + 1}行)"
+            )
+        return issues
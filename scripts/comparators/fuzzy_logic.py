@@ -1,63 +1,166 @@
 
 import re
+import unicodedata
+
+import numpy as np
+
+from parsers.columnar import ColumnarTable
+from comparators.row_aligner import RowAligner
+from comparators.column_mapper import ColumnMapper
+from utils.assignment import solve_assignment
+from utils.nlp_utils import NLPUtils
 
 class DataComparator:
-    def compare_datasets(self, data1, data2):
-        # We need to match tables. 
-        # Heuristic: Compare headers intersect.
-        
+    # Weights of the table-matching score
+    MATCH_WEIGHTS = {'headers': 0.5, 'types': 0.15, 'rows': 0.1, 'keys': 0.25}
+    MIN_MATCH_SCORE = 0.3
+    # Two headers are close above this character-set Jaccard ("营业收入" ~ "营业总收入", "期末余额" ~ "期初余额")
+    HEADER_SIM = 0.6
+
+    def __init__(self, nlp=None):
+        self.nlp = nlp or NLPUtils()
+
+    def compare_datasets(self, data1, data2, state=None):
+        """
+        state: optional IncrementalState; table pairs whose content is unchanged since the
+        previous run reuse the stored diff.
+        Tables are paired by a global one-to-one assignment; tables left without a partner
+        are reported as whole-table differences.
+        """
         report = []
         
-        # Match tables
-        # Ideally, we greedily match tables that look similar
-        used_indices_2 = set()
+        matches = self.match_tables(data1, data2)
+        matched1 = {i for i, _, _ in matches}
+        matched2 = {j for _, j, _ in matches}
         
-        for t1_idx, t1 in enumerate(data1):
-            best_t2_idx = -1
-            best_header_score = -1
-            
-            h1_set = set(t1['headers'])
-            
-            for t2_idx, t2 in enumerate(data2):
-                if t2_idx in used_indices_2: continue
-                
-                h2_set = set(t2['headers'])
-                # Intersection score
-                inter = h1_set.intersection(h2_set)
-                score = len(inter)
-                
-                if score > best_header_score and score > 0:
-                    best_header_score = score
-                    best_t2_idx = t2_idx
-            
-            if best_t2_idx != -1:
-                used_indices_2.add(best_t2_idx)
-                # Compare these two tables
-                t_diff = self.compare_table(t1, data2[best_t2_idx])
-                if t_diff:
-                    report.append(t_diff)
+        for i, j, _ in matches:
+            t1, t2 = data1[i], data2[j]
+            if state:
+                t_diff = state.memo('table_pairs', [t1, t2], lambda: self.compare_table(t1, t2))
             else:
-                pass # Unmatched table in file 1
+                t_diff = self.compare_table(t1, t2)
+            if t_diff:
+                report.append(t_diff)
+        
+        for i, t in enumerate(data1):
+            if i not in matched1:
+                report.append(self.unmatched_table(t, "missing_in_file2"))
+        for j, t in enumerate(data2):
+            if j not in matched2:
+                report.append(self.unmatched_table(t, "missing_in_file1"))
                 
         return report
 
+    def unmatched_table(self, t, side):
+        diff = {
+            "title": f"未匹配表格 (表头: {' / '.join(t['headers'][:6])})",
+            "missing_in_file2": [],
+            "missing_in_file1": [],
+            "row_diffs": []
+        }
+        diff[side].append(f"整表 ({len(t['rows'])} 行)")
+        return diff
+
+    def match_tables(self, data1, data2):
+        """
+        Scores candidate table pairs and solves the assignment globally.
+        Candidates come from an index of header bigrams, so tables that share no header
+        text at all are never scored. Returns [(i, j, score)].
+        """
+        profiles1 = [self.table_profile(t) for t in data1]
+        profiles2 = [self.table_profile(t) for t in data2]
+        
+        # Every distinct header pair is scored once, in one batch, for all candidate table pairs
+        heads1 = sorted({h for p in profiles1 for h in p['headers']})
+        heads2 = sorted({h for p in profiles2 for h in p['headers']})
+        sim = self.nlp.similarity_matrix(heads1, heads2, mode='char', n=1)
+        close = {(heads1[a], heads2[b]) for a, b in zip(*np.nonzero(sim >= self.HEADER_SIM))}
+        
+        index = {}
+        for j, p in enumerate(profiles2):
+            for g in p['grams']:
+                index.setdefault(g, set()).add(j)
+        
+        scores = {}
+        for i, p1 in enumerate(profiles1):
+            candidates = set()
+            for g in p1['grams']:
+                candidates |= index.get(g, set())
+            for j in candidates:
+                score = self.table_match_score(p1, profiles2[j], close)
+                if score >= self.MIN_MATCH_SCORE:
+                    scores[(i, j)] = score
+                    
+        return solve_assignment(scores)
+
+    def table_profile(self, t):
+        headers = [self.normalize_header(h) for h in t['headers']]
+        grams = set()
+        for h in headers:
+            grams |= {h[k:k + 2] for k in range(len(h) - 1)} if len(h) > 1 else {h}
+        grams.discard('')
+        
+        types = {}
+        for h in t['headers']:
+            ty = self.column_type([r.get(h, "") for r in t['rows'][:50]])
+            types[ty] = types.get(ty, 0) + 1
+        
+        keys = {self.get_key_val(r, t['pk']) for r in t['rows']}
+        keys.discard("")
+        # Header signature: tables with the same header set skip the fuzzy header scoring
+        sig = hash(frozenset(headers))
+        return {'headers': headers, 'sig': sig, 'grams': grams, 'types': types, 'rows': len(t['rows']), 'keys': keys}
+
+    def table_match_score(self, p1, p2, close):
+        # 1. Fuzzy header overlap: share of headers with a close counterpart (close: set of header pairs)
+        h1, h2 = p1['headers'], p2['headers']
+        if not h1 or not h2: return 0.0
+        if p1['sig'] == p2['sig'] and len(h1) == len(h2):
+            header_sim = 1.0
+        else:
+            set2 = set(h2)
+            hits = 0
+            for h in h1:
+                if h in set2 or any((h, o) in close for o in h2):
+                    hits += 1
+            header_sim = hits / max(len(h1), len(h2))
+        if header_sim == 0: return 0.0
+        
+        # 2. Column type mix
+        ty1, ty2 = p1['types'], p2['types']
+        common = sum(min(ty1.get(k, 0), ty2.get(k, 0)) for k in ty1)
+        type_sim = common / max(sum(ty1.values()), sum(ty2.values()), 1)
+        
+        # 3. Row-count ratio
+        rows_sim = min(p1['rows'], p2['rows']) / max(p1['rows'], p2['rows'], 1)
+        
+        # 4. Primary-key value overlap
+        k1, k2 = p1['keys'], p2['keys']
+        key_sim = len(k1 & k2) / len(k1 | k2) if (k1 or k2) else 0.0
+        
+        w = self.MATCH_WEIGHTS
+        return w['headers'] * header_sim + w['types'] * type_sim + w['rows'] * rows_sim + w['keys'] * key_sim
+
+    def normalize_header(self, h):
+        h = unicodedata.normalize('NFKC', h or "")
+        return re.sub(r'\s+', '', h)
+
+    def column_type(self, values):
+        values = [v for v in values if v]
+        if not values: return "empty"
+        if all(v.endswith('%') and self.parse_num(v[:-1]) is not None for v in values): return "percent"
+        if all(self.parse_num(v) is not None for v in values): return "number"
+        if all(re.search(r'\d{4}[年.\-/]\d{1,2}', v) for v in values): return "date"
+        return "text"
+
     def compare_table(self, t1, t2):
         # Use Primary Key to align rows
         # PKs might be slightly different key names, so we need to map headers first?
         # Assuming header names are relatively consistent or using first matching ones.
         
-        # Create map of rows by PK
-        rows1_map = {}
-        for r in t1['rows']:
-            key = self.get_key_val(r, t1['pk'])
-            rows1_map[key] = r
-            
-        rows2_map = {}
-        for r in t2['rows']:
-            key = self.get_key_val(r, t2['pk'])
-            rows2_map[key] = r
-            
-        all_keys = set(rows1_map.keys()) | set(rows2_map.keys())
+        keys1 = [self.get_key_val(r, t1['pk']) for r in t1['rows']]
+        keys2 = [self.get_key_val(r, t2['pk']) for r in t2['rows']]
+        
         table_diffs = {
             "title": f"Table comparison (Key: {t1['pk']})",
             "missing_in_file2": [],
@@ -65,85 +168,95 @@ class DataComparator:
             "row_diffs": []
         }
         
-        for k in all_keys:
-            if not k: continue # Skip empty keys
-            
-            r1 = rows1_map.get(k)
-            r2 = rows2_map.get(k)
-            
-            if not r1:
-                table_diffs["missing_in_file1"].append(f"Row {k}")
-                continue
-            if not r2:
-                table_diffs["missing_in_file2"].append(f"Row {k}")
-                continue
-                
-            # Compare fields
-            # We iterate over headers of t1
-            row_field_diffs = []
-            
-            for h in t1['headers']:
-                val1 = r1.get(h, "")
-                # Find corresponding header in t2
-                # Simple exact match for now
-                val2 = r2.get(h, "")
-                
-                # Check for equivalence
-                if not self.is_equivalent(val1, val2, h):
-                    row_field_diffs.append({
-                        "field": h,
-                        "v1": val1,
-                        "v2": val2
-                    })
-            
+        # Row alignment: exact key join (duplicates kept), then blocked fuzzy matching
+        pairs, only1, only2 = RowAligner().align(keys1, keys2)
+        for i in only1:
+            table_diffs["missing_in_file2"].append(f"Row {keys1[i]}")
+        for j in only2:
+            table_diffs["missing_in_file1"].append(f"Row {keys2[j]}")
+        
+        if not pairs:
+            return table_diffs
+        
+        # Compare fields column by column on the typed columnar views, through the
+        # t1 -> t2 column mapping ("金额（万元）" vs "金额(万元)", "合同金额" vs "金额")
+        column_pairs, unmapped1, unmapped2 = ColumnMapper().map_columns(t1, t2)
+        if unmapped1 or unmapped2:
+            table_diffs["unmapped_columns"] = {"file1": unmapped1, "file2": unmapped2}
+        idx1 = np.array([i for i, _, _ in pairs])
+        idx2 = np.array([j for _, j, _ in pairs])
+        bad = self.compare_columns(ColumnarTable.of(t1), ColumnarTable.of(t2), idx1, idx2, column_pairs)
+        
+        for pos, (i, j, confidence) in enumerate(pairs):
+            row_field_diffs = bad.get(pos, [])
             if row_field_diffs:
+                k = keys1[i] if keys1[i] == keys2[j] else f"{keys1[i]} ≈ {keys2[j]}"
                 table_diffs["row_diffs"].append({
                     "key": k,
+                    "confidence": round(confidence, 2),
                     "diffs": row_field_diffs
                 })
                 
         return table_diffs
 
+    def compare_columns(self, c1, c2, idx1, idx2, column_pairs):
+        """
+        Cell equivalence over aligned rows, one whole column at a time: equal strings; for amount
+        fields, equal numbers (a "-" placeholder is not the number 0 here); for date / time fields,
+        the same date in another format; otherwise the same text once spaces / bracket widths are ignored.
+        idx1 / idx2: row indices of matched rows; column_pairs: [(header in t1, header in t2, scale)],
+        scale converting file-2 amounts into file-1 units.
+        Returns {position in idx arrays: [field diffs]}.
+        """
+        bad = {}
+        seen = set()
+        for h1, h2, scale in column_pairs:
+            if h1 in seen: continue
+            seen.add(h1)
+            v1 = c1.column(h1)[idx1]
+            v2 = c2.column(h2)[idx2]
+            eq = v1 == v2
+            
+            # Loose equivalence: same text once spaces / bracket widths are ignored
+            loose = c1.column(h1, 'text')[idx1] == c2.column(h2, 'text')[idx2]
+            if self.is_date_field(h1):
+                d1 = c1.column(h1, 'date')[idx1]
+                d2 = c2.column(h2, 'date')[idx2]
+                loose |= ~np.isnat(d1) & (d1 == d2)
+            
+            if self.is_numeric_field(h1):
+                n1 = c1.column(h1, 'amount')[idx1]
+                n2 = c2.column(h2, 'amount')[idx2] * scale
+                # The amount columns read "-" as 0 for sum checks; as a cell value it is not a number
+                both = ~np.isnan(n1) & ~np.isnan(n2) & (v1 != "-") & (v2 != "-")
+                # When both sides are numbers the numeric verdict is final
+                eq |= np.where(both, np.abs(n1 - n2) < 0.01, loose)
+            else:
+                eq |= loose
+            
+            for pos in np.flatnonzero(~eq):
+                bad.setdefault(int(pos), []).append({
+                    "field": h1,
+                    "v1": v1[pos],
+                    "v2": v2[pos]
+                })
+        return bad
+
+    def is_numeric_field(self, field_name):
+        return "金额" in field_name or "价格" in field_name or "收入" in field_name
+
+    def is_date_field(self, field_name):
+        return "日期" in field_name or "时间" in field_name
+
     def get_key_val(self, row, pk_cols):
         vals = []
         for c in pk_cols:
             vals.append(row.get(c, row.get(c.replace('Mini', 'Mini '), ""))) # HACK for specific case
         return "|".join(vals)
 
-    def is_equivalent(self, v1, v2, field_name):
-        if v1 == v2: return True
-        
-        # Check numeric
-        if "金额" in field_name or "价格" in field_name or "收入" in field_name:
-             n1 = self.parse_num(v1)
-             n2 = self.parse_num(v2)
-             if n1 is not None and n2 is not None:
-                 return abs(n1 - n2) < 0.01
-                 
-        # Check date
-        if "日期" in field_name or "时间" in field_name:
-            d1 = self.normalize_date(v1)
-            d2 = self.normalize_date(v2)
-            if d1 and d2 and d1 == d2: return True
-            
-        # Check string loose
-        s1 = v1.replace(" ", "").replace("（", "(").replace("）", ")")
-        s2 = v2.replace(" ", "").replace("（", "(").replace("）", ")")
-        if s1 == s2: return True
-        
-        return False
-
     def parse_num(self, s):
         try:
             clean = s.replace(",", "").replace("，", "").replace("万元", "").replace("元", "")
             return float(clean)
         except:
             return None
-
-    def normalize_date(self, s):
-        # Copy logic from previous task
-        m1 = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', s)
-        if m1: return f"{m1.group(1)}-{m1.group(2).zfill(2)}-{m1.group(3).zfill(2)}"
-        m2 = re.search(r'(\d{4})\.(\d{1,2})\.(\d{1,2})', s)
-        if m2: return f"{m2.group(1)}-{m2.group(2).zfill(2)}-{m2.group(3).zfill(2)}"
-        return s
@@ -0,0 +1,92 @@
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "document-comparison", "llm_cache.sqlite")
+
+def normalize_section_text(text):
+    """
+    Canonical form used for cache keys and the "identical, don't ask" shortcut:
+    full-width -> half-width, all whitespace removed.
+    """
+    if not text: return ""
+    text = unicodedata.normalize('NFKC', text)
+    return re.sub(r'\s+', '', text)
+
+class LLMResponseCache:
+    """
+    SQLite cache of LLM section comparisons.
+    Key: SHA-256 of (model, prompt version, normalized text A, normalized text B).
+    Entries older than `ttl` seconds are ignored and purged; beyond `max_entries`
+    the least recently used rows are dropped.
+    """
+    def __init__(self, path=None, ttl=30 * 86400, max_entries=50000):
+        self.path = path or DEFAULT_CACHE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # Batch workers share the file; wait on locks instead of failing
+            self.conn = sqlite3.connect(self.path, timeout=30)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+        return self.conn
+
+    def make_key(self, model, prompt_version, text_a, text_b):
+        h = hashlib.sha256()
+        for part in (model, prompt_version, normalize_section_text(text_a), normalize_section_text(text_b)):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def get(self, key):
+        try:
+            conn = self.connect()
+            now = time.time()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if not row: return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"⚠️ LLM 缓存读取失败: {e}")
+            return None
+
+    def put(self, key, value):
+        try:
+            conn = self.connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ LLM 缓存写入失败: {e}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -1,20 +1,77 @@
 
 import os
 import json
+import time
+import random
+import asyncio
 import logging
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+
+from comparators.llm_cache import LLMResponseCache, normalize_section_text
+
+# Bump whenever build_messages changes, so cached responses to the old prompt are not reused
+PROMPT_VERSION = "1"
+
+_openai = None
+
+def load_openai():
+    """
+    Imports openai on first use only (it takes most of the startup time otherwise).
+    Returns (OpenAI, AsyncOpenAI), or (None, None) when the library is missing.
+    """
+    global _openai
+    if _openai is None:
+        try:
+            from openai import OpenAI, AsyncOpenAI
+            _openai = (OpenAI, AsyncOpenAI)
+        except ImportError:
+            _openai = (None, None)
+    return _openai
+
+# Characters of each side sent per request; longer sections are split into consecutive windows
+SECTION_WINDOW_CHARS = 4000
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` requests per second on average, bursts up to `capacity`.
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
 
 class LLMClient:
     def __init__(self):
         self.api_key = os.getenv("LLM_API_KEY") or os.getenv("OPENAI_API_KEY")
         self.base_url = os.getenv("LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL")
         self.model = os.getenv("LLM_MODEL") or "gpt-4o"
-        
+        # Section-level stage: parallel requests, requests/second, retries on 429 / 5xx
+        self.concurrency = int(os.getenv("LLM_CONCURRENCY") or 4)
+        self.rate = float(os.getenv("LLM_RPS") or 2.0)
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES") or 5)
+
+        # Local response cache (LLM_CACHE=off disables it)
+        self.cache = None
+        if (os.getenv("LLM_CACHE") or "on").lower() not in ("0", "off", "false"):
+            ttl_days = float(os.getenv("LLM_CACHE_TTL_DAYS") or 30)
+            self.cache = LLMResponseCache(os.getenv("LLM_CACHE_PATH"), ttl=ttl_days * 86400)
+
         self.client = None
-        if self.api_key and OpenAI:
+        # No key, no import: runs without the LLM never load openai
+        OpenAI = load_openai()[0] if self.api_key else None
+        if OpenAI:
             self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
         else:
             print("⚠️ LLM API Key not found or OpenAI lib missing. Formatting check pending.")
@@ -22,14 +79,11 @@ class LLMClient:
     def is_available(self):
         return self.client is not None
 
-    def compare_sections(self, text_a, text_b, section_name=""):
-        if not self.client:
-            return None
-
+    def build_messages(self, text_a, text_b, section_name=""):
         prompt = f"""
         你是一位专业的IPO律师助手。请对比以下两段关于“{section_name}”的文本，找出实质性的业务差异（如主体变更、金额、时间、权利义务、关联关系等）。
         忽略格式修饰、标点符号和单纯的措辞优化。
-        
+
         如果发现实质差异，请按以下 JSON 格式输出：
         {{
             "has_diff": true,
@@ -39,27 +93,170 @@ class LLMClient:
             ]
         }}
         如果无实质差异，仅输出 {{"has_diff": false}}。
-        
+
         文本A：
-        {text_a[:4000]} 
-        (截断...)
-        
+        {text_a}
+
         文本B：
-        {text_b[:4000]}
-        (截断...)
+        {text_b}
         """
-        
+        return [
+            {"role": "system", "content": "You are a precise legal document assistant. Output JSON only."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def lookup(self, text_a, text_b):
+        """
+        Answers a comparison without the API when possible.
+        Returns (result, cache_key); result is None when a request is needed.
+        """
+        if normalize_section_text(text_a) == normalize_section_text(text_b):
+            return {"has_diff": False}, None
+        if not self.cache:
+            return None, None
+        key = self.cache.make_key(self.model, PROMPT_VERSION, text_a, text_b)
+        return self.cache.get(key), key
+
+    def remember(self, key, result):
+        if self.cache and key and result is not None:
+            self.cache.put(key, result)
+
+    def compare_sections(self, text_a, text_b, section_name=""):
+        if not self.client:
+            return None
+
+        text_a = text_a[:SECTION_WINDOW_CHARS]
+        text_b = text_b[:SECTION_WINDOW_CHARS]
+        cached, key = self.lookup(text_a, text_b)
+        if cached is not None:
+            return cached
+
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a precise legal document assistant. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self.build_messages(text_a, text_b, section_name),
                 response_format={"type": "json_object"}
             )
             content = response.choices[0].message.content
-            return json.loads(content)
+            result = json.loads(content)
+            self.remember(key, result)
+            return result
         except Exception as e:
             print(f"LLM Error: {e}")
             return None
+
+    # --- Section-level async stage ---
+
+    def split_windows(self, section):
+        """
+        One aligned section -> list of (name, text_a, text_b) requests covering the whole section.
+        """
+        a = section.get('text_a') or ''
+        b = section.get('text_b') or ''
+        name = section.get('section', '')
+        n = max(1, -(-max(len(a), len(b)) // SECTION_WINDOW_CHARS))
+        if n == 1:
+            return [(name, a, b)]
+        # Cut both sides at the same relative positions so windows stay roughly aligned
+        jobs = []
+        for k in range(n):
+            sa = a[len(a) * k // n: len(a) * (k + 1) // n]
+            sb = b[len(b) * k // n: len(b) * (k + 1) // n]
+            jobs.append((f"{name} ({k + 1}/{n})", sa, sb))
+        return jobs
+
+    def compare_aligned(self, aligned_sections, state=None):
+        """
+        Compares every aligned section (SectionChunker.align_sections output) as its own request.
+        Returns the insights that report a difference, each tagged with its 'section'.
+        state: optional IncrementalState; sections unchanged since the previous run reuse its result.
+        """
+        if not self.client or not load_openai()[1]:
+            return []
+
+        jobs = []
+        for s in aligned_sections:
+            if s.get('unchanged') or not (s.get('text_a') or s.get('text_b')): continue
+            jobs.extend(self.split_windows(s))
+        if not jobs: return []
+
+        return asyncio.run(self.run_jobs(jobs, state=state))
+
+    async def run_jobs(self, jobs, client=None, state=None):
+        own_client = client is None
+        if own_client:
+            AsyncOpenAI = load_openai()[1]
+            client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate)
+        stats = {'sent': 0, 'skipped': 0}
+
+        async def one(job):
+            _, text_a, text_b = job
+            if state:
+                found, previous = state.get('llm_sections', job)
+                if found:
+                    stats['skipped'] += 1
+                    return previous
+            cached, key = self.lookup(text_a, text_b)
+            if cached is not None:
+                stats['skipped'] += 1
+                result = cached
+            else:
+                async with semaphore:
+                    stats['sent'] += 1
+                    result = await self.request_with_retry(client, bucket, *job)
+                self.remember(key, result)
+            if state and result is not None:
+                state.put('llm_sections', job, result)
+            return result
+
+        try:
+            results = await asyncio.gather(*(one(j) for j in jobs))
+        finally:
+            if own_client:
+                await client.close()
+        print(f"🤖 LLM: {stats['sent']} requests sent, {stats['skipped']} answered from cache / previous run / identical text")
+
+        insights = []
+        for (name, _, _), res in zip(jobs, results):
+            if res and res.get('has_diff'):
+                insights.append(dict(res, section=name))
+        return insights
+
+    async def request_with_retry(self, client, bucket, section_name, text_a, text_b):
+        messages = self.build_messages(text_a, text_b, section_name)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"}
+                )
+                return json.loads(response.choices[0].message.content)
+            except json.JSONDecodeError as e:
+                logging.warning(f"LLM returned invalid JSON for {section_name}: {e}")
+                return None
+            except Exception as e:
+                status = getattr(e, 'status_code', None)
+                # Retry rate limits, server errors and transport errors (no status); give up on other 4xx
+                retryable = status is None or status == 429 or status >= 500
+                if not retryable or attempt == self.max_retries:
+                    print(f"LLM Error ({section_name}): {e}")
+                    return None
+                await asyncio.sleep(self.retry_delay(e, attempt))
+        return None
+
+    def retry_delay(self, error, attempt):
+        # Honour Retry-After when the server sends it, else exponential backoff with jitter
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('retry-after') if hasattr(headers, 'get') else None
+        if retry_after:
+            try:
+                return min(60.0, float(retry_after))
+            except ValueError:
+                pass
+        return min(30.0, 0.5 * (2 ** attempt)) + random.uniform(0, 0.25)
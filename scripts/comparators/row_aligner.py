@@ -0,0 +1,106 @@
+
+import re
+import difflib
+import unicodedata
+
+from utils.assignment import solve_assignment
+
+class RowAligner:
+    """
+    Aligns table rows of two files by primary-key value.
+    1. Exact hash join on normalized keys. Repeated keys keep their multiplicity:
+       the k-th occurrence in file 1 pairs with the k-th occurrence in file 2.
+    2. Leftover rows are fuzzy-matched on a compact key form (letters, digits, CJK only),
+       with candidates blocked by key grams (bigrams plus 4-grams) so no all-pairs comparison is
+       ever made. Grams shared by more than max_posting leftover keys, like the "ZL20" of patent
+       numbers, are skipped; 4-grams keep long numeric keys separable once their bigrams are all
+       common. A one-to-one assignment over the candidate scores picks the matches.
+    Every matched pair carries a confidence: 1.0 for exact matches, the key similarity otherwise.
+    """
+    MAX_DENSE = 2500 # Candidate groups above rows x columns are assigned greedily, not by Hungarian
+
+    def __init__(self, min_confidence=0.75, max_candidates=5, max_posting=64):
+        self.min_confidence = min_confidence
+        self.max_candidates = max_candidates
+        self.max_posting = max_posting
+
+    def normalize_key(self, key):
+        key = unicodedata.normalize('NFKC', key or "")
+        return re.sub(r'\s+', '', key).lower()
+
+    def compact_key(self, key):
+        return re.sub(r'[^0-9a-z\u4e00-\u9fa5]', '', self.normalize_key(key))
+
+    def bigrams(self, s):
+        if len(s) < 2: return {s}
+        return {s[i:i + 2] for i in range(len(s) - 1)}
+
+    def grams(self, s):
+        # Bigrams for short / CJK keys, 4-grams (prefixed so they never collide with bigrams) for long codes
+        return self.bigrams(s) | {'#' + s[i:i + 4] for i in range(len(s) - 3)}
+
+    def align(self, keys1, keys2):
+        """
+        keys1 / keys2: key string per row. Rows with an empty key are ignored.
+        Returns (pairs, only1, only2): pairs = [(i, j, confidence)], only1 / only2 = row indices.
+        """
+        pairs = []
+
+        # 1. Exact join with multiplicity
+        buckets = {}
+        for j, k in enumerate(keys2):
+            nk = self.normalize_key(k)
+            if nk: buckets.setdefault(nk, []).append(j)
+        for nk in buckets:
+            buckets[nk].reverse() # pop() hands out occurrences in document order
+
+        left1 = []
+        for i, k in enumerate(keys1):
+            nk = self.normalize_key(k)
+            if not nk: continue
+            queue = buckets.get(nk)
+            if queue:
+                pairs.append((i, queue.pop(), 1.0))
+            else:
+                left1.append(i)
+        left2 = sorted(j for queue in buckets.values() for j in queue)
+
+        # 2. Fuzzy match of the leftovers, blocked by grams of the compact key
+        if left1 and left2:
+            compact2 = {j: self.compact_key(keys2[j]) for j in left2}
+            index = {}
+            for j, c in compact2.items():
+                for g in self.grams(c):
+                    index.setdefault(g, []).append(j)
+
+            # Common prefixes ("ZL20…", "HT00…") would make every leftover row a candidate
+            max_posting = self.max_posting
+            scores = {}
+            for i in left1:
+                c1 = self.compact_key(keys1[i])
+                if not c1: continue
+                shared = {}
+                postings = [index.get(g, []) for g in self.grams(c1)]
+                usable = [p for p in postings if len(p) <= max_posting]
+                # A key made only of common grams still needs candidates: use the rarest one
+                if not usable and postings:
+                    usable = [min(postings, key=len)[:max_posting]]
+                for p in usable:
+                    for j in p:
+                        shared[j] = shared.get(j, 0) + 1
+                for j in sorted(shared, key=lambda j: -shared[j])[:self.max_candidates]:
+                    c2 = compact2[j]
+                    # Identical once punctuation is dropped is near-certain, but not exact
+                    ratio = 0.99 if c1 == c2 else difflib.SequenceMatcher(None, c1, c2).ratio()
+                    if ratio >= self.min_confidence:
+                        scores[(i, j)] = ratio
+
+            fuzzy = solve_assignment(scores, self.MAX_DENSE)
+            pairs.extend(fuzzy)
+            matched1 = {i for i, _, _ in fuzzy}
+            matched2 = {j for _, j, _ in fuzzy}
+            left1 = [i for i in left1 if i not in matched1]
+            left2 = [j for j in left2 if j not in matched2]
+
+        pairs.sort()
+        return pairs, left1, left2
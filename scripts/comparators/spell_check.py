@@ -1,49 +1,103 @@
 
-import re
+import os
+
+from utils.lexicon_trie import LexiconTrie
+
+# Built-in domain terms; a user lexicon (--lexicon, one term per line) is added on top.
+# Every lexicon entry is also accepted as correct, so near-identical real names must be listed
+# (e.g. 中国银联 / 中国银河 next to 中国银行).
+DEFAULT_LEXICON = [
+    # Banks
+    "中国银行", "中国人民银行", "中国工商银行", "中国农业银行", "中国建设银行", "交通银行", "招商银行",
+    "中国邮政储蓄银行", "国家开发银行", "中国进出口银行", "中国农业发展银行", "中信银行", "中国光大银行",
+    "华夏银行", "中国民生银行", "兴业银行", "上海浦东发展银行", "平安银行", "广发银行", "浙商银行",
+    "渤海银行", "恒丰银行", "北京银行", "上海银行", "江苏银行", "宁波银行", "南京银行",
+    "中国银联", "中国银河", "中国银河证券", "中国银行业协会", "中国银行间市场交易商协会",
+    # Regulators and market infrastructure
+    "中国证券监督管理委员会", "中国证监会", "中国银行保险监督管理委员会", "中国银保监会",
+    "中国银行业监督管理委员会", "中国银监会", "中国保险监督管理委员会", "中国保监会",
+    "国家金融监督管理总局", "国家外汇管理局", "国家市场监督管理总局", "国务院国有资产监督管理委员会",
+    "上海证券交易所", "深圳证券交易所", "北京证券交易所", "全国中小企业股份转让系统",
+    "中国证券登记结算有限责任公司", "中国证券业协会", "中国注册会计师协会",
+    # Statutes
+    "中华人民共和国公司法", "中华人民共和国证券法", "中华人民共和国民法典", "中华人民共和国合同法",
+    "首次公开发行股票注册管理办法", "上市公司信息披露管理办法",
+]
+
+# Bracket pairs checked across lines (ASCII brackets are left out: "1)" list markers are common)
+BRACKETS = {'（': '）', '【': '】', '《': '》', '“': '”'}
+CLOSERS = {v: k for k, v in BRACKETS.items()}
 
 class SpellChecker:
-    def check_file(self, file_path):
-        # We might need raw text for spell check
-        # For now, let's assume we can read the file as txt via textutil if needed,
-        # or just regex on the file name/content? 
-        # Let's rely on the previous helper to get text.
-        
+    """
+    Proofreading against a domain lexicon (built-in terms plus an optional user file).
+    - Near misses of lexicon terms (edit distance 1, or 2 for terms of 8+ characters) are found
+      in one pass over the text with a trie-driven Levenshtein automaton (see LexiconTrie).
+    - Bracket balance is checked with one stack over the whole text, so a bracket opened on one
+      line and closed on the next is fine.
+    """
+    # Built tries per lexicon file (path, mtime, size), shared by every checker in the process
+    _tries = {}
+
+    def __init__(self, lexicon_path=None):
+        self.lexicon_path = lexicon_path
+        self.signature = None
+        if lexicon_path:
+            st = os.stat(lexicon_path)
+            self.signature = (os.path.abspath(lexicon_path), st.st_mtime, st.st_size)
+        self.trie = self.load_trie()
+
+    def load_trie(self):
+        trie = self._tries.get(self.signature)
+        if trie is not None: return trie
+        trie = LexiconTrie(DEFAULT_LEXICON)
+        if self.lexicon_path:
+            with open(self.lexicon_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # One term per line; '#' starts a comment, extra tab-separated columns are ignored
+                    term = line.split('#', 1)[0].split('\t', 1)[0].strip()
+                    if term: trie.add(term)
+        self._tries[self.signature] = trie
+        return trie
+
+    def check(self, ctx):
+        """
+        ctx: DocumentContext built once per file.
+        """
         errors = []
-        
-        # Mock logic based on user request (checking common low-level errors)
-        
-        # 1. Read content
-        try:
-           # Simple read? Or subprocess textutil to txt
-           import subprocess
-           res = subprocess.run(['textutil', '-convert', 'txt', '-stdout', file_path], capture_output=True, text=True)
-           content = res.stdout
-        except:
-            return ["Could not read file for spell check"]
-
-        # 2. Key Terms Check
-        # "中国银" -> "中国银行"
-        for m in re.finditer(r'中国银[^行]', content):
-            # Check if it's "中国银联" (valid)
-            obj = m.group(0)
-            if "联" in obj or "监" in obj: continue
-            errors.append(f"疑似错别字: '{obj}' (附近: ...{content[m.start()-5:m.end()+5].replace(chr(10), ' ')}...) -> 建议检查是否漏掉'行'")
-            
-        # 3. Brackets Check
-        # Find lines with unbalanced brackets
-        lines = content.split('\n')
-        for i, line in enumerate(lines):
-            l = line.strip()
-            if not l: continue
-            c1 = l.count('（')
-            c2 = l.count('）')
-            if c1 != c2:
-                errors.append(f"Line {i+1}: 中文括号数量不匹配 (左:{c1}, 右:{c2}) -> {l[:50]}...")
-                
-            c3 = l.count('(')
-            c4 = l.count(')')
-            if c3 != c4:
-                # English brackets often unbalanced in code or math, but in contract usually should match
-                pass 
-                
+        content = ctx.text
+
+        # 1. Key Terms Check: near misses of lexicon terms ("中国银" -> "中国银行")
+        for start, end, term, dist in self.trie.scan(content):
+            obj = content[start:end]
+            around = content[max(0, start - 5):end + 5].replace(chr(10), ' ')
+            errors.append(f"疑似错别字: '{obj}' (附近: ...{around}...) -> 建议检查是否应为'{term}'")
+
+        # 2. Brackets Check: one stack across lines
+        stack = [] # (bracket, offset)
+        unbalanced = [] # (offset, issue)
+        for i, ch in enumerate(content):
+            if ch in BRACKETS:
+                stack.append((ch, i))
+            elif ch in CLOSERS:
+                opener = CLOSERS[ch]
+                if stack and stack[-1][0] == opener:
+                    stack.pop()
+                elif any(b == opener for b, _ in stack):
+                    # Brackets opened inside this pair were never closed
+                    while stack[-1][0] != opener:
+                        unbalanced.append(self.bracket_issue(ctx, stack.pop(), "括号未闭合"))
+                    stack.pop()
+                else:
+                    unbalanced.append(self.bracket_issue(ctx, (ch, i), "多余的右括号"))
+        for item in stack:
+            unbalanced.append(self.bracket_issue(ctx, item, "括号未闭合"))
+        errors.extend(issue for _, issue in sorted(unbalanced))
+
         return errors
+
+    def bracket_issue(self, ctx, item, what):
+        ch, offset = item
+        n = ctx.line_of(offset)
+        l = ctx.lines[n].strip()
+        return offset, f"Line {n+1}: {what} '{ch}' -> {l[:50]}..."
@@ -0,0 +1,215 @@
+
+import re
+import hashlib
+import unicodedata
+
+from parsers.section_chunker import prose_text
+
+TOKEN_CHAR_RE = re.compile(r'[0-9A-Za-z.,，%]')
+
+def myers_opcodes(a, b, max_d=2000):
+    """
+    Myers O(ND) diff of two sequences. Returns difflib-style opcodes
+    [(tag, i1, i2, j1, j2)] with tag in 'equal' / 'delete' / 'insert' / 'replace'.
+    Past max_d edits the middle part is reported as one 'replace' block.
+    """
+    n, m = len(a), len(b)
+    # Common prefix / suffix never enter the O(ND) search
+    pre = 0
+    while pre < n and pre < m and a[pre] == b[pre]:
+        pre += 1
+    suf = 0
+    while suf < n - pre and suf < m - pre and a[n - 1 - suf] == b[m - 1 - suf]:
+        suf += 1
+    a_mid, b_mid = a[pre:n - suf], b[pre:m - suf]
+
+    edits = myers_edits(a_mid, b_mid, max_d)
+    if edits is None:
+        edits = [('delete', i) for i in range(len(a_mid))] + [('insert', j) for j in range(len(b_mid))]
+
+    # Per-element edits -> opcode runs, in the coordinates of the full sequences
+    ops = []
+    if pre: ops.append(['equal', 0, pre, 0, pre])
+    i, j = pre, pre
+    for tag, _ in edits:
+        if tag == 'equal':
+            step = (1, 1)
+        elif tag == 'delete':
+            step = (1, 0)
+        else:
+            step = (0, 1)
+        kind = 'equal' if tag == 'equal' else 'change'
+        if ops and (ops[-1][0] == kind or (kind == 'change' and ops[-1][0] == 'change')):
+            ops[-1][2] += step[0]
+            ops[-1][4] += step[1]
+        else:
+            ops.append([kind, i, i + step[0], j, j + step[1]])
+        i += step[0]
+        j += step[1]
+    if suf: ops.append(['equal', n - suf, n, m - suf, m])
+
+    result = []
+    for kind, i1, i2, j1, j2 in ops:
+        if kind == 'change':
+            kind = 'replace' if i1 < i2 and j1 < j2 else ('delete' if i1 < i2 else 'insert')
+        if result and result[-1][0] == kind == 'equal':
+            result[-1] = ('equal', result[-1][1], i2, result[-1][3], j2)
+        else:
+            result.append((kind, i1, i2, j1, j2))
+    return result
+
+def myers_edits(a, b, max_d):
+    """
+    Shortest edit script as [('equal' | 'delete' | 'insert', index)], or None past max_d edits.
+    """
+    n, m = len(a), len(b)
+    if not n and not m: return []
+    limit = min(n + m, max_d)
+    off = limit + 1
+    v = [0] * (2 * limit + 3)
+    trace = []
+    for d in range(limit + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+                x = v[off + k + 1]
+            else:
+                x = v[off + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[off + k] = x
+            if x >= n and y >= m:
+                return backtrack(trace, off, n, m)
+    return None
+
+def backtrack(trace, off, x, y):
+    edits = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[off + k - 1] < v[off + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[off + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            edits.append(('equal', x))
+        if d > 0:
+            if x == prev_x:
+                edits.append(('insert', prev_y))
+            else:
+                edits.append(('delete', prev_x))
+        x, y = prev_x, prev_y
+    edits.reverse()
+    return edits
+
+class TextDiffer:
+    """
+    Deterministic prose diff of aligned sections.
+    1. Sections whose whitespace-insensitive hash is equal are skipped outright.
+    2. A line-level Myers pass finds the changed line blocks (lines hashed to ints first). Lines are
+       NFKC-normalized, and table rows (the entry's table_rows_a / table_rows_b, taken from the
+       document model) are blanked and left to the table comparison.
+    3. Changed blocks are refined per character, which suits unsegmented Chinese; equal runs of
+       a single character between two changes are folded into the change so edits read as words.
+    Output per changed section: {'index', 'section', 'status', 'ops': [{'op', 'a', 'b', 'line_a', 'line_b'}]}.
+    """
+    MAX_BLOCK_CHARS = 20000 # Larger changed blocks are reported whole, not refined per character
+
+    def fingerprint(self, text):
+        norm = re.sub(r'\s+', '', unicodedata.normalize('NFKC', text or ""))
+        return hashlib.sha1(norm.encode('utf-8')).hexdigest()
+
+    def diff_aligned(self, aligned, state=None):
+        """
+        aligned: SectionChunker.align_trees / align_sections output.
+        state: optional IncrementalState; section pairs diffed in the previous run are reused.
+        """
+        results = []
+        for idx, s in enumerate(aligned):
+            if s.get('unchanged'): continue
+            text_a, text_b = s.get('text_a', ''), s.get('text_b', '')
+            if self.fingerprint(text_a) == self.fingerprint(text_b): continue
+            status = 'added' if not text_a.strip() else ('removed' if not text_b.strip() else 'modified')
+            text_a, text_b = prose_text(text_a, s.get('table_rows_a')), prose_text(text_b, s.get('table_rows_b'))
+            if state:
+                ops = state.memo('text_diff', [text_a, text_b], lambda: self.diff_texts(text_a, text_b))
+            else:
+                ops = self.diff_texts(text_a, text_b)
+            if not ops: continue
+            results.append({'index': idx, 'section': s['section'], 'status': status, 'ops': ops})
+        return results
+
+    def diff_texts(self, text_a, text_b):
+        lines_a = [self.normalize_line(l) for l in text_a.split('\n')]
+        lines_b = [self.normalize_line(l) for l in text_b.split('\n')]
+        ids = {}
+        ha = [ids.setdefault(l, len(ids)) for l in lines_a]
+        hb = [ids.setdefault(l, len(ids)) for l in lines_b]
+
+        ops = []
+        for tag, i1, i2, j1, j2 in myers_opcodes(ha, hb):
+            if tag == 'equal': continue
+            block_a = "\n".join(l for l in lines_a[i1:i2] if l)
+            block_b = "\n".join(l for l in lines_b[j1:j2] if l)
+            if not block_a and not block_b: continue # Only blank lines moved
+            if tag != 'replace' or len(block_a) + len(block_b) > self.MAX_BLOCK_CHARS:
+                ops.append(self.op(tag, block_a, block_b, i1, j1))
+                continue
+            ops.extend(self.refine(block_a, block_b, i1, j1))
+        return ops
+
+    def normalize_line(self, line):
+        # NFKC folds full-width / half-width variants (（ vs ()
+        return unicodedata.normalize('NFKC', line).strip()
+
+    def refine(self, a, b, line_a, line_b):
+        """
+        Character-level ops inside one replaced line block.
+        """
+        opcodes = [list(o) for o in myers_opcodes(a, b, max_d=1000)]
+
+        # Fold tiny equal runs between two changes into one change
+        merged = []
+        for o in opcodes:
+            if merged and o[0] != 'equal' and len(merged) >= 2 and merged[-1][0] == 'equal' \
+                    and merged[-1][2] - merged[-1][1] <= 1 and merged[-2][0] != 'equal':
+                merged.pop()
+                merged[-1] = ['replace', merged[-1][1], o[2], merged[-1][3], o[4]]
+                continue
+            if merged and o[0] != 'equal' and merged[-1][0] != 'equal':
+                merged[-1] = ['replace', merged[-1][1], o[2], merged[-1][3], o[4]]
+                continue
+            merged.append(o)
+
+        # A change inside a number or latin word widens to the whole token ("5000" -> "5100", not "0" -> "1")
+        widened = []
+        for tag, i1, i2, j1, j2 in merged:
+            if tag == 'equal': continue
+            while i1 > 0 and j1 > 0 and a[i1 - 1] == b[j1 - 1] and TOKEN_CHAR_RE.match(a[i1 - 1]):
+                i1 -= 1
+                j1 -= 1
+            while i2 < len(a) and j2 < len(b) and a[i2] == b[j2] and TOKEN_CHAR_RE.match(a[i2]):
+                i2 += 1
+                j2 += 1
+            if widened and i1 <= widened[-1][2]:
+                widened[-1] = ['replace', widened[-1][1], i2, widened[-1][3], j2]
+            else:
+                widened.append([tag, i1, i2, j1, j2])
+
+        ops = []
+        for tag, i1, i2, j1, j2 in widened:
+            if tag == 'replace' and (i1 == i2 or j1 == j2):
+                tag = 'insert' if i1 == i2 else 'delete'
+            ops.append(self.op(tag, a[i1:i2], b[j1:j2], line_a + a.count('\n', 0, i1), line_b + b.count('\n', 0, j1),
+                               context=a[max(0, i1 - 12):i1].split('\n')[-1]))
+        return ops
+
+    def op(self, tag, a, b, line_a, line_b, context=""):
+        # line_a / line_b: 0-based line within the section
+        return {'op': tag, 'a': a, 'b': b, 'line_a': line_a, 'line_b': line_b, 'context': context}
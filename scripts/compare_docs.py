@@ -1,63 +1,71 @@
 
 import sys
+
+# --profile-startup has to hook the import system before anything else is imported
+profiler = None
+if "--profile-startup" in sys.argv:
+    from utils.import_profiler import ImportProfiler
+    profiler = ImportProfiler().install()
+
 import os
 import argparse
-import subprocess
-import difflib
+import functools
 
-from parsers.table_parser import TableParser
+from parsers.document_context import DocumentContext
+from parsers.office_parser import DocumentReadError
 from comparators.fuzzy_logic import DataComparator
 from comparators.spell_check import SpellChecker
 from comparators.logic_check import LogicChecker
 from comparators.consistency_check import ConsistencyChecker
+from comparators.fact_check import FactChecker
+from comparators.text_diff import TextDiffer
+from comparators.entity_diff import EntityDiffer
 from comparators.llm_client import LLMClient # New
-from utils.nlp_utils import NLPUtils         # New
+from utils.nlp_utils import NLPUtils         # New (jieba loads on first use)
 from parsers.section_chunker import SectionChunker # New
+from parsers.section_moves import MoveDetector
 from reporters.md_reporter import MDReporter
-import re
+from utils.batch_runner import BatchRunner
+from utils.file_pairing import FilePairer
+from utils.extract_cache import ExtractionCache
+from utils.incremental import IncrementalState
 import json
 
-# Initialize global NLP utils
+# Cheap to build: jieba is only imported on the first similarity lookup
 nlp = NLPUtils()
 
-def convert_to_html(file_path):
-    base_name = os.path.basename(file_path)
-    tmp_path = f"/tmp/{base_name}.html"
-    if file_path.lower().endswith('.docx'):
-        try:
-            subprocess.run(['textutil', '-convert', 'html', '-stdout', file_path], stdout=open(tmp_path, 'w'), stderr=subprocess.DEVNULL, check=True)
-            return tmp_path
-        except:
-            return None
-    return file_path
-
-def convert_to_text(file_path):
-    try:
-        res = subprocess.run(['textutil', '-convert', 'txt', '-stdout', file_path], capture_output=True, text=True)
-        return res.stdout
-    except:
-        return ""
-
-def process_pair(f1, f2, reporter):
+def process_pair(f1, f2, reporter, cache=None, incremental=False, table_profile=None, lexicon=None, align='content'):
     print(f"Comparing: {os.path.basename(f1)} <-> {os.path.basename(f2)}")
     
-    # 1. Structure Analysis (Tables)
-    h1 = convert_to_html(f1)
-    h2 = convert_to_html(f2)
+    # Incremental mode: per-table / per-section results of the previous run are reused
+    # wherever their content fingerprint is unchanged
+    state = None
+    if incremental:
+        state_path = os.path.join(os.path.dirname(f1), f"Comparison_State_{os.path.basename(f1)}_vs_{os.path.basename(f2)}.json")
+        state = IncrementalState(state_path)
+    
+    # 1. One context per file: text, tables and sections are extracted once and shared
+    # (or loaded from the extraction cache when the file bytes were seen before)
+    ctx1 = DocumentContext.from_file(f1, cache, table_profile)
+    ctx2 = DocumentContext.from_file(f2, cache, table_profile)
     
     # Save text for Agent Analysis
-    t1 = convert_to_text(f1)
-    t2 = convert_to_text(f2)
+    t1 = ctx1.text
+    t2 = ctx2.text
     
-    tp = TableParser()
-    d1 = tp.parse(h1) if h1 else []
-    d2 = tp.parse(h2) if h2 else []
+    # Structure Analysis (Tables)
+    d1 = ctx1.tables
+    d2 = ctx2.tables
     
     # --- Section Aware Processing (New v3.5) ---
+    # Chapters whose whole subtree is unchanged collapse into one 'unchanged' entry
     chunker = SectionChunker()
-    secs1 = chunker.chunk_text(t1)
-    secs2 = chunker.chunk_text(t2)
-    aligned_data = chunker.align_sections(secs1, secs2)
+    aligned_data = chunker.align_trees(ctx1.section_tree, ctx2.section_tree)
+    if align == 'content':
+        # Sections left unmatched by header are paired by content (MinHash/LSH): moved or renamed
+        aligned_data = MoveDetector().detect(aligned_data, ctx1.section_tree, ctx2.section_tree)
+        moves = sum(1 for s in aligned_data if s.get('match'))
+        if moves: print(f"🔀 {moves} moved/renamed sections paired by content")
     
     # Save Aligned Data for Agent
     output_dir = os.path.dirname(f1)
@@ -68,62 +76,39 @@ def process_pair(f1, f2, reporter):
         
     print(f"✅ Generated Aligned JSON: {json_path}")
     
+    # Deterministic prose diff of every aligned section (identical sections skipped by hash)
+    text_diffs = TextDiffer().diff_aligned(aligned_data, state)
+    # Figures and dates that changed inside modified sections (5,000万元 vs 5000.00万元 is not a change)
+    entity_conflicts = EntityDiffer().diff_aligned(aligned_data, text_diffs, state)
+    
     # --- End Section Aware Processing ---
 
     
-    # 2. Table Data Comparison (With Semantic Matching in Fuzzy Logic)
-    
-    # ❌ FIX: Extract "Actual Controller" / "Controlling Shareholder" via Regex from Text
-    # Because one file might have it in text paragraph, other in table.
-    # We add a virtual table for this.
-    
-    def extract_key_personnel(text):
-        info = {}
-        # Pattern: "实际控制人[为|是][:：]?\s*([\u4e00-\u9fa5]+)"
-        # Or in tables, captured by next line... but let's try text first.
-        # This is a heuristic.
-        m_ctrl = re.search(r'(?:实际控制人|实控人)[为|是|：|:]?\s*([\u4e00-\u9fa5]{2,10})', text)
-        if m_ctrl: info['实际控制人'] = m_ctrl.group(1)
-        
-        m_share = re.search(r'(?:控股股东)[为|是|：|:]?\s*([\u4e00-\u9fa5]{2,10})', text)
-        if m_share: info['控股股东'] = m_share.group(1)
-        return info
-
-    kp1 = extract_key_personnel(t1)
-    kp2 = extract_key_personnel(t2)
-    
-    # If found in both, compare
-    kp_issues = []
-    for k in ['实际控制人', '控股股东']:
-        v1 = kp1.get(k)
-        v2 = kp2.get(k)
-        if v1 and v2 and v1 != v2:
-            # Simple fuzzy check
-            if nlp.get_similarity(v1, v2) < 0.8:
-                kp_issues.append(f"⚠️ {k} 不一致: {os.path.basename(f1)}='{v1}' vs {os.path.basename(f2)}='{v2}'")
-            
-    # Also inject these issues into the reporter later
-
+    # Cross-document facts (definitions, controllers, share counts, registered capital, dates):
+    # one may be in a text paragraph in one file and in a table in the other, so both full texts are scanned.
+    fact_issues = FactChecker(similarity=nlp.get_similarity).compare(ctx1, ctx2)
     
     # 2. Table Data Comparison (With Semantic Matching in Fuzzy Logic)
-    # We ideally update fuzzy_logic to use nlp.get_similarity() but for now keep structured logic
-    cmp = DataComparator()
-    diffs = cmp.compare_datasets(d1, d2)
+    # Header similarity goes through the shared NLPUtils token cache
+    cmp = DataComparator(nlp)
+    diffs = cmp.compare_datasets(d1, d2, state)
     
     # 3. Logic & Consistency Checks
     lc = LogicChecker()
     cc = ConsistencyChecker()
-    sc = SpellChecker()
+    sc = SpellChecker(lexicon)
     
-    extra_issues1 = sc.check_file(f1) + cc.check_file(f1)
-    extra_issues2 = sc.check_file(f2) + cc.check_file(f2)
+    def text_checks(ctx):
+        if state:
+            # The lexicon is part of the key: a changed lexicon re-checks every text
+            return state.memo('text_checks', [ctx.text, sc.signature], lambda: sc.check(ctx) + cc.check(ctx))
+        return sc.check(ctx) + cc.check(ctx)
     
-    for t in d1: extra_issues1.extend(lc.check_table_logic(t))
-    for t in d1: extra_issues1.extend(lc.check_table_logic(t))
-    for t in d2: extra_issues2.extend(lc.check_table_logic(t))
+    extra_issues1 = text_checks(ctx1) + lc.check(ctx1, state)
+    extra_issues2 = text_checks(ctx2) + lc.check(ctx2, state)
     
-    # Add Key Personnel Issues
-    extra_issues1.extend(kp_issues)
+    # Add cross-document fact issues
+    extra_issues1.extend(fact_issues)
     
     # 4. LLM Insight (The Real Intelligence)
     llm = LLMClient()
@@ -131,66 +116,85 @@ def process_pair(f1, f2, reporter):
     
     if llm.is_available():
         print("🤖 Invoking LLM for semantic analysis...")
-        t1 = convert_to_text(f1)
-        t2 = convert_to_text(f2)
         
-        # Simple chunking: Compare first 4000 chars as summary? 
-        # Or better: if small enough, compare whole. If large, compare specific keywords sections.
-        # For this demo, we compare the first 8000 chars which usually contains the meat.
-        insight = llm.compare_sections(t1[:8000], t2[:8000], section_name="全文核心内容")
-        if insight and insight.get('has_diff'):
-            llm_insights.append(insight)
+        # Every changed section is compared on its own (concurrent, rate limited), so the
+        # whole document is covered; sections the text diff found identical are never sent.
+        changed_sections = [aligned_data[d['index']] for d in text_diffs]
+        llm_insights = llm.compare_aligned(changed_sections, state)
     else:
         # Fallback: Just mentioning semantic similarity check passed via Jieba
         pass
 
-    return reporter.generate(diffs, extra_issues1, extra_issues2, f1, f2, llm_insights)
+    if state:
+        state.save()
+        print(f"♻️ Incremental: {state.hits} units reused, {state.misses} recomputed")
 
-def find_best_match(target_file, candidate_files):
-    target_name = os.path.basename(target_file)
-    best_match = None
-    best_ratio = 0.0
-    
-    for c in candidate_files:
-        c_name = os.path.basename(c)
-        # Use Jieba/NLP similarity for filename matching too?
-        # For now difflib is safer for filenames
-        ratio = difflib.SequenceMatcher(None, target_name, c_name).ratio()
-        if ratio > best_ratio:
-            best_ratio = ratio
-            best_match = c
-            
-    if best_ratio > 0.4:
-        return best_match
-    return None
+    return reporter.generate(diffs, extra_issues1, extra_issues2, f1, f2, llm_insights, text_diffs, entity_conflicts, aligned_data)
+
+def run_pair(f1, f2, cache=None, incremental=False, table_profile=None, lexicon=None, align='content'):
+    # Process-pool entry point: each worker builds its own reporter
+    return process_pair(f1, f2, MDReporter(), cache, incremental, table_profile, lexicon, align)
 
 def main():
     parser = argparse.ArgumentParser(description="Document Comparison Skill v3.0 (AI Powered)")
     parser.add_argument("path1", help="File or Folder 1")
     parser.add_argument("path2", help="File or Folder 2")
+    parser.add_argument("--jobs", type=int, default=1, help="Batch mode: parallel worker processes (0 = all cores)")
+    parser.add_argument("--pairing-report", action="store_true", help="Batch mode: write Pairing_Report.md and stop before comparing")
+    parser.add_argument("--cache-dir", default=None, help="Extraction cache directory (default: ~/.cache/document-comparison/extract)")
+    parser.add_argument("--no-cache", action="store_true", help="Always re-extract documents")
+    parser.add_argument("--incremental", action="store_true", help="Reuse results of the previous run for unchanged tables and sections")
+    parser.add_argument("--table-profile", default=None, help="Table header/key keyword profile: default, financial, legal, or a JSON file")
+    parser.add_argument("--lexicon", default=None, help="Domain lexicon for the spell check (one term per line), added to the built-in terms")
+    parser.add_argument("--align", choices=["header", "content"], default="content", help="Section alignment: by header only, or also pair moved/renamed sections by content")
+    parser.add_argument("--profile-startup", action="store_true", help="Print the import time of every module loaded during the run")
     args = parser.parse_args()
     
     p1 = os.path.abspath(args.path1)
     p2 = os.path.abspath(args.path2)
     
     reporter = MDReporter()
+    cache = None if args.no_cache else ExtractionCache(args.cache_dir)
     
     if os.path.isdir(p1) and os.path.isdir(p2):
         print("📂 Batch Mode Activated")
         files1 = [os.path.join(p1, f) for f in os.listdir(p1) if f.endswith('.docx') or f.endswith('.doc')]
         files2_pool = [os.path.join(p2, f) for f in os.listdir(p2) if f.endswith('.docx') or f.endswith('.doc')]
         
-        for f1 in files1:
-            match = find_best_match(f1, files2_pool)
-            if match:
-                process_pair(f1, match, reporter)
-            else:
-                print(f"⚠️ No match for {os.path.basename(f1)}")
+        matched, unmatched, unmatched2 = FilePairer().pair(files1, files2_pool)
+        pairs = [(f1, f2) for f1, f2, _ in matched]
+        for f in unmatched:
+            print(f"⚠️ No match for {os.path.basename(f)}")
+        for f in unmatched2:
+            print(f"⚠️ No match for {os.path.basename(f)} (folder 2)")
+        
+        if args.pairing_report:
+            report_path = reporter.generate_pairing_report(matched, unmatched, unmatched2, p1)
+            print(f"✅ Generated Pairing Report: {report_path}")
+            return
+        
+        runner = BatchRunner(jobs=args.jobs)
+        results = runner.run(pairs, functools.partial(run_pair, cache=cache, incremental=args.incremental, table_profile=args.table_profile, lexicon=args.lexicon, align=args.align))
+        
+        print("\n📋 Batch Results:")
+        for r in results:
+            status = "✅" if r['status'] == 'ok' else f"❌ {r['error']}"
+            print(f"  {r['seconds']:7.1f}s  {os.path.basename(r['file1'])} <-> {os.path.basename(r['file2'])}  {status}")
+        summary_path = reporter.generate_batch_summary(results, p1, unmatched + unmatched2)
+        print(f"✅ Generated Batch Summary: {summary_path}")
                 
     elif os.path.isfile(p1) and os.path.isfile(p2):
-        process_pair(p1, p2, reporter)
+        try:
+            process_pair(p1, p2, reporter, cache, args.incremental, args.table_profile, args.lexicon, args.align)
+        except DocumentReadError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
     else:
         print("Error: Invalid paths.")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        if profiler:
+            print(profiler.report())
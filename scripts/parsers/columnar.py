@@ -0,0 +1,99 @@
+
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+AMOUNT_RE = re.compile(r'^[-+]?\d+(?:\.\d+)?$')
+PERCENT_RE = re.compile(r'^[-+]?\d+(?:\.\d+)?$')
+DATE_RES = [
+    re.compile(r'(\d{4})年(\d{1,2})月(\d{1,2})日'),
+    re.compile(r'(\d{4})\.(\d{1,2})\.(\d{1,2})'),
+]
+
+def parse_amount(s):
+    if not s: return np.nan
+    clean = s.replace(",", "").replace("，", "").replace("万元", "").replace("元", "")
+    if clean == "-": return 0.0
+    return float(clean) if AMOUNT_RE.match(clean) else np.nan
+
+def parse_percent(s):
+    if not s: return np.nan
+    clean = s.replace("%", "").replace(",", "").replace(" ", "")
+    if clean == "-": return 0.0
+    return float(clean) if PERCENT_RE.match(clean) else np.nan
+
+def parse_date(s):
+    for r in DATE_RES:
+        m = r.search(s)
+        if m:
+            try:
+                return np.datetime64(f"{m.group(1)}-{m.group(2).zfill(2)}-{m.group(3).zfill(2)}", 'D')
+            except ValueError:
+                return np.datetime64('NaT')
+    return np.datetime64('NaT')
+
+def loose_text(s):
+    return s.replace(" ", "").replace("（", "(").replace("）", ")")
+
+class ColumnarTable:
+    """
+    Column-oriented view of one TableParser table. Every cell is parsed exactly once into
+    typed NumPy columns:
+    - raw: normalized cell strings (object arrays)
+    - amount / percent: float64, NaN where the cell is not a number
+    - date: datetime64[D], NaT where the cell is not a date
+    - text: loose strings (spaces dropped, full-width brackets folded)
+    Comparisons and sum checks then run as whole-column array operations.
+    """
+    _cache = OrderedDict()
+    _cache_size = 256
+
+    def __init__(self, table):
+        self.headers = list(table.get('headers', []))
+        rows = table.get('rows', [])
+        self.n_rows = len(rows)
+
+        self.raw = {}
+        self.amount = {}
+        self.percent = {}
+        self.date = {}
+        self.text = {}
+        for h in self.headers:
+            if h in self.raw: continue # Duplicate header names share one column, as in the row dicts
+            values = [r.get(h, "") for r in rows]
+            self.raw[h] = np.array(values, dtype=object)
+            self.amount[h] = np.fromiter((parse_amount(v) for v in values), dtype=np.float64, count=len(values))
+            self.percent[h] = np.fromiter((parse_percent(v) for v in values), dtype=np.float64, count=len(values))
+            self.date[h] = np.array([parse_date(v) for v in values], dtype='datetime64[D]')
+            self.text[h] = np.array([loose_text(v) for v in values], dtype=object)
+
+        # First cell of every row (where "合计" / "Total" labels live)
+        self.first = np.array([str(next(iter(r.values()))) if r else "" for r in rows], dtype=object)
+
+    @classmethod
+    def of(cls, table):
+        """
+        Columnar view of a table dict, built once and reused by every consumer (bounded LRU).
+        """
+        key = id(table)
+        entry = cls._cache.get(key)
+        if entry is not None and entry[0] is table:
+            cls._cache.move_to_end(key)
+            return entry[1]
+        col = cls(table)
+        cls._cache[key] = (table, col)
+        if len(cls._cache) > cls._cache_size:
+            cls._cache.popitem(last=False)
+        return col
+
+    def column(self, h, kind='raw'):
+        store = getattr(self, kind)
+        if h in store: return store[h]
+        # Missing column: all-empty of the right type
+        if kind in ('amount', 'percent'): return np.full(self.n_rows, np.nan)
+        if kind == 'date': return np.full(self.n_rows, np.datetime64('NaT'), dtype='datetime64[D]')
+        return np.full(self.n_rows, "", dtype=object)
+
+    def total_mask(self):
+        return np.array(["合计" in v or "总计" in v or "Total" in v for v in self.first], dtype=bool)
@@ -0,0 +1,97 @@
+
+import os
+import re
+import json
+import bisect
+import hashlib
+from functools import cached_property
+
+from parsers.office_parser import OfficeParser
+from parsers.table_parser import TableParser
+from parsers.table_detect import load_profile
+from parsers.section_chunker import SectionChunker
+
+TOKEN_RE = re.compile(r'[\u4e00-\u9fa5]+|[A-Za-z]+|\d+(?:[.,，]\d+)*')
+NUMBER_RE = re.compile(r'-?\d+(?:[,，]\d{3})*(?:\.\d+)?%?')
+
+# Bump whenever OfficeParser / TableParser / SectionChunker output changes, so cached extractions are invalidated
+EXTRACTION_VERSION = "7"
+
+class DocumentContext:
+    """
+    Everything the checkers need about one file, built once per file.
+    Derived data (line offsets, tokens, number spans) is computed lazily on first use.
+    """
+    def __init__(self, path, text, tables, doc=None, styled_headers=None, table_lines=None):
+        self.path = path
+        self.text = text
+        self.tables = tables       # TableParser.parse output
+        self.doc = doc             # OfficeDocument, if the context came from a fresh parse
+        self.styled_headers = styled_headers or {} # Word heading text -> level
+        self.table_lines = set(table_lines or ()) # Line numbers of self.text that are table rows
+
+    @classmethod
+    def from_file(cls, path, cache=None, table_profile=None):
+        """
+        cache: optional ExtractionCache; on a hit the file is not parsed at all.
+        table_profile: keyword profile name or JSON path for table header / key detection.
+        """
+        profile = load_profile(table_profile)
+        key = None
+        if cache:
+            # Different profiles yield different tables, so the profile is part of the key
+            profile_fp = hashlib.sha1(json.dumps(profile, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:8]
+            key = cache.key_for(path, f"{EXTRACTION_VERSION}-{profile_fp}")
+            hit = cache.get(key)
+            if hit:
+                return cls(path, hit['text'], hit['tables'], styled_headers=hit['headings'], table_lines=hit['table_lines'])
+
+        doc = OfficeParser().parse(path)
+        tables = TableParser(profile).parse(doc)
+        # The section tree is rebuilt from text + heading styles + table rows on demand, so only those are cached
+        styled_headers = SectionChunker().styled_headers(doc)
+        if cache:
+            cache.put(key, {'text': doc.text, 'tables': tables, 'headings': styled_headers, 'table_lines': doc.table_lines})
+        return cls(path, doc.text, tables, doc, styled_headers, doc.table_lines)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @cached_property
+    def section_tree(self):
+        # Nested SectionNode tree over self.text; content is sliced lazily per node
+        return SectionChunker().build_tree(self.text, self.styled_headers, self.table_lines)
+
+    @cached_property
+    def sections(self):
+        # Flat section list (SectionChunker.chunk_text format), derived from the tree
+        return [n.as_section() for n in self.section_tree.walk() if n.has_body]
+
+    @cached_property
+    def lines(self):
+        return self.text.split('\n')
+
+    @cached_property
+    def line_offsets(self):
+        # Character offset of the start of every line
+        offsets = [0]
+        for line in self.lines[:-1]:
+            offsets.append(offsets[-1] + len(line) + 1)
+        return offsets
+
+    def line_of(self, offset):
+        """
+        0-based line number containing a character offset.
+        """
+        return bisect.bisect_right(self.line_offsets, offset) - 1
+
+    @cached_property
+    def tokens(self):
+        # Coarse tokens: CJK runs, latin words, numbers (no jieba needed)
+        return TOKEN_RE.findall(self.text)
+
+    @cached_property
+    def number_spans(self):
+        # (start, end, raw) for every number in the text
+        return [(m.start(), m.end(), m.group(0)) for m in NUMBER_RE.finditer(self.text)]
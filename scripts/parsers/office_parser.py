@@ -1,5 +1,250 @@
 
-# Placeholder for future expansion (OfficeParser)
-# Currently handled inline or via textutil
+import os
+import re
+import shutil
+import subprocess
+import zipfile
+import zlib
+import xml.etree.ElementTree as ET
+
+# WordprocessingML namespace, used for every tag in document.xml / styles.xml
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+W = '{%s}' % W_NS
+
+class DocumentReadError(Exception):
+    """
+    A file that cannot be read at all (corrupt / not a zip / no document body). Raised instead of
+    returning an empty document, so a batch run records the pair as failed rather than comparing
+    against nothing.
+    """
+
+class OfficeDocument:
+    """
+    In-memory model of one document, built once per file.
+    - paragraphs: list of {'text': ..., 'style': ..., 'level': ...} (level > 0 for headings)
+    - tables: list of raw tables, each a list of rows, each row a list of cell strings
+    - blocks: body order as ('p', idx) / ('t', idx) so text can be rebuilt faithfully
+    """
+    def __init__(self, path, paragraphs=None, tables=None, blocks=None):
+        self.path = path
+        self.paragraphs = paragraphs or []
+        self.tables = tables or []
+        self.blocks = blocks if blocks is not None else [('p', i) for i in range(len(self.paragraphs))]
+        self._text = None
+        self._table_lines = None
+
+    @property
+    def headings(self):
+        return [p for p in self.paragraphs if p.get('level')]
+
+    @property
+    def text(self):
+        # Plain text rendering: one line per paragraph, table rows as tab-separated cells
+        if self._text is None:
+            self.render()
+        return self._text
+
+    @property
+    def table_lines(self):
+        # 0-based numbers of the lines of `text` that are table rows (paragraphs may contain tabs too)
+        if self._table_lines is None:
+            self.render()
+        return self._table_lines
+
+    def render(self):
+        out = []
+        table_lines = []
+        line = 0
+        for kind, idx in self.blocks:
+            if kind == 'p':
+                text = self.paragraphs[idx]['text']
+                out.append(text)
+                line += text.count('\n') + 1
+            else:
+                for row in self.tables[idx]:
+                    out.append('\t'.join(c.replace('\n', ' ') for c in row))
+                    table_lines.append(line)
+                    line += 1
+        self._text = '\n'.join(out)
+        self._table_lines = table_lines
+
+    @property
+    def lines(self):
+        return self.text.split('\n')
+
+
 class OfficeParser:
-    pass
+    """
+    In-process document reader. .docx is read straight from the zip container with a
+    streaming XML pass, so no external converter (textutil) is needed.
+    """
+    def parse(self, file_path):
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.docx':
+            return self.parse_docx(file_path)
+        if ext == '.doc':
+            return self.parse_legacy_doc(file_path)
+        return self.parse_plain_text(file_path)
+
+    def parse_plain_text(self, file_path):
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().split('\n')
+        return OfficeDocument(file_path, [{'text': l, 'style': '', 'level': 0} for l in lines])
+
+    def parse_legacy_doc(self, file_path):
+        # Binary .doc has no XML payload; fall back to whatever converter the host provides
+        for cmd in (['textutil', '-convert', 'txt', '-stdout', file_path], ['antiword', file_path]):
+            if not shutil.which(cmd[0]): continue
+            try:
+                res = subprocess.run(cmd, capture_output=True, text=True, check=True)
+                lines = res.stdout.split('\n')
+                return OfficeDocument(file_path, [{'text': l, 'style': '', 'level': 0} for l in lines])
+            except (OSError, subprocess.CalledProcessError):
+                continue
+        raise DocumentReadError(f"无法读取 .doc 文件 (需要 textutil 或 antiword): {os.path.basename(file_path)}")
+
+    def parse_docx(self, file_path):
+        paragraphs = []
+        tables = []
+        blocks = []
+
+        try:
+            zf = zipfile.ZipFile(file_path)
+        except (OSError, zipfile.BadZipFile) as e:
+            raise DocumentReadError(f"无法打开 docx 文件: {os.path.basename(file_path)} ({e})") from e
+
+        with zf:
+            if 'word/document.xml' not in zf.namelist():
+                raise DocumentReadError(f"docx 文件缺少正文 (word/document.xml): {os.path.basename(file_path)}")
+            styles = self.load_styles(zf)
+
+            # Table stack: nested tables each keep their own rows / current row / current cell
+            # Paragraph stack: text boxes can open a paragraph inside another paragraph
+            table_stack = []
+            para_stack = []
+            open_tags = [] # Enclosing elements of the current one
+
+            with zf.open('word/document.xml') as f:
+                for event, elem in self.iter_events(f, file_path):
+                    tag = elem.tag
+                    if event == 'start':
+                        open_tags.append(tag)
+                        if tag == W + 'p':
+                            para_stack.append({'parts': [], 'style': '', 'outline': None})
+                        elif tag == W + 'tbl':
+                            table_stack.append({'rows': [], 'row': None, 'cell': None, 'span': 1, 'vmerge': None})
+                        elif tag == W + 'tr' and table_stack:
+                            table_stack[-1]['row'] = []
+                        elif tag == W + 'tc' and table_stack:
+                            table_stack[-1]['cell'] = []
+                            table_stack[-1]['span'] = 1
+                            table_stack[-1]['vmerge'] = None
+                        continue
+
+                    # end events
+                    open_tags.pop()
+                    para = para_stack[-1] if para_stack else None
+                    if tag == W + 't':
+                        if elem.text and para: para['parts'].append(elem.text)
+                    elif tag == W + 'tab':
+                        # Only a run's tab is text; w:pPr/w:tabs/w:tab are tab-stop definitions
+                        if para and open_tags[-1] == W + 'r': para['parts'].append('\t')
+                    elif tag == W + 'br' or tag == W + 'cr':
+                        if para: para['parts'].append('\n')
+                    elif tag == W + 'pStyle':
+                        if para: para['style'] = elem.get(W + 'val', '')
+                    elif tag == W + 'outlineLvl':
+                        if para: para['outline'] = elem.get(W + 'val')
+                    elif tag == W + 'p' and para:
+                        para_stack.pop()
+                        text = ''.join(para['parts'])
+                        if table_stack and table_stack[-1]['cell'] is not None:
+                            table_stack[-1]['cell'].append(text)
+                        elif para_stack:
+                            # Text box content flows into the enclosing paragraph
+                            para_stack[-1]['parts'].append(text)
+                        else:
+                            level = self.heading_level(para['style'], para['outline'], styles)
+                            blocks.append(('p', len(paragraphs)))
+                            paragraphs.append({'text': text, 'style': para['style'], 'level': level})
+                    elif tag == W + 'gridSpan' and table_stack:
+                        try:
+                            table_stack[-1]['span'] = max(1, int(elem.get(W + 'val', '1')))
+                        except ValueError:
+                            pass
+                    elif tag == W + 'vMerge' and table_stack:
+                        table_stack[-1]['vmerge'] = elem.get(W + 'val') or 'continue'
+                    elif tag == W + 'tc' and table_stack:
+                        t = table_stack[-1]
+                        if t['row'] is not None and t['cell'] is not None:
+                            text = '\n'.join(t['cell']).strip()
+                            col = len(t['row'])
+                            # Vertically merged continuation: repeat the text of the cell above
+                            if t['vmerge'] == 'continue' and t['rows'] and col < len(t['rows'][-1]):
+                                text = t['rows'][-1][col]
+                            # Horizontally merged: fill every grid column the cell covers
+                            t['row'].extend([text] * t['span'])
+                        t['cell'] = None
+                    elif tag == W + 'tr' and table_stack:
+                        t = table_stack[-1]
+                        if t['row']: t['rows'].append(t['row'])
+                        t['row'] = None
+                    elif tag == W + 'tbl' and table_stack:
+                        t = table_stack.pop()
+                        if t['rows']:
+                            if not table_stack:
+                                blocks.append(('t', len(tables)))
+                            tables.append(t['rows'])
+                            # Nested table: keep it as its own table, and leave its text in the parent cell
+                            if table_stack and table_stack[-1]['cell'] is not None:
+                                table_stack[-1]['cell'].extend('\t'.join(r) for r in t['rows'])
+
+                    # Body children are fully consumed at this point; drop them to keep memory flat
+                    if len(open_tags) == 2:
+                        elem.clear()
+
+        return OfficeDocument(file_path, paragraphs, tables, blocks)
+
+    def iter_events(self, f, file_path):
+        # Streaming parse of document.xml; a truncated or corrupt body is a read error, not an empty document
+        try:
+            yield from ET.iterparse(f, events=('start', 'end'))
+        except (ET.ParseError, zipfile.BadZipFile, zlib.error, EOFError) as e:
+            raise DocumentReadError(f"docx 正文已损坏: {os.path.basename(file_path)} ({e})") from e
+
+    def load_styles(self, zf):
+        """
+        Returns styleId -> heading level (0 if the style is not a heading).
+        """
+        styles = {}
+        try:
+            f = zf.open('word/styles.xml')
+        except KeyError:
+            return styles
+
+        with f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag != W + 'style': continue
+                style_id = elem.get(W + 'styleId', '')
+                name_el = elem.find(W + 'name')
+                name = name_el.get(W + 'val', '') if name_el is not None else ''
+                outline_el = elem.find(W + 'pPr/' + W + 'outlineLvl')
+                outline = outline_el.get(W + 'val') if outline_el is not None else None
+                styles[style_id] = self.heading_level(name, outline, {})
+                elem.clear()
+        return styles
+
+    def heading_level(self, style, outline, styles):
+        # Explicit outline level on the paragraph wins (0-based, 9 = body text)
+        if outline is not None and outline.isdigit() and int(outline) < 9:
+            return int(outline) + 1
+        if not style:
+            return 0
+        if style in styles:
+            return styles[style]
+        m = re.match(r'^(?:heading|标题)\s*(\d)$', style.strip(), re.IGNORECASE)
+        if m:
+            return int(m.group(1))
+        if style.lower() == 'title':
+            return 1
+        return 0
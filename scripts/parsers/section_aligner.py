@@ -0,0 +1,153 @@
+
+import re
+import difflib
+import unicodedata
+
+class FenwickMax:
+    """
+    Prefix-maximum tree over positions 0..n-1, storing (value, payload).
+    """
+    def __init__(self, n):
+        self.n = n
+        self.tree = [(0.0, -1)] * (n + 1)
+
+    def update(self, pos, item):
+        i = pos + 1
+        while i <= self.n:
+            if item[0] > self.tree[i][0]:
+                self.tree[i] = item
+            i += i & -i
+
+    def query(self, pos):
+        # Best item over positions [0, pos)
+        best = (0.0, -1)
+        i = pos
+        while i > 0:
+            if self.tree[i][0] > best[0]:
+                best = self.tree[i]
+            i -= i & -i
+        return best
+
+class SectionAligner:
+    """
+    Order-preserving section alignment.
+    1. Character bigram inverted index over B headers -> a few candidates per A header.
+    2. Candidates are scored with SequenceMatcher (only candidates, never all pairs).
+    3. A weighted LCS over the candidate pairs (sparse DP with a Fenwick tree, O(K log n))
+       picks the best set of matches that keeps both documents in order.
+    Duplicate headers stay separate sections: each is matched at most once, by position.
+    """
+    def __init__(self, threshold=0.6, max_candidates=8):
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+
+    def normalize(self, header):
+        header = unicodedata.normalize('NFKC', header)
+        return re.sub(r'\s+', '', header)
+
+    def bigrams(self, s):
+        if len(s) < 2: return {s}
+        return {s[i:i + 2] for i in range(len(s) - 1)}
+
+    def candidate_pairs(self, headers_a, headers_b):
+        """
+        Returns [(i, j, score)] for header pairs above the similarity threshold.
+        """
+        norm_a = [self.normalize(h) for h in headers_a]
+        norm_b = [self.normalize(h) for h in headers_b]
+        n, m = len(norm_a), len(norm_b)
+
+        index = {}
+        for j, h in enumerate(norm_b):
+            for g in self.bigrams(h):
+                index.setdefault(g, []).append(j)
+
+        # Very common grams ("情况", "公司") would make every header a candidate
+        max_posting = max(50, m // 10)
+
+        pairs = []
+        for i, h in enumerate(norm_a):
+            shared = {}
+            grams = self.bigrams(h)
+            postings = [index.get(g, []) for g in grams]
+            usable = [p for p in postings if len(p) <= max_posting]
+            # A header made only of common grams still needs candidates
+            for p in (usable or postings):
+                for j in p:
+                    shared[j] = shared.get(j, 0) + 1
+
+            # Most shared grams first; ties (e.g. duplicate titles) go to the closest relative position
+            pos = i / n
+            ranked = sorted(shared, key=lambda j: (-shared[j], abs(j / m - pos)))
+            for j in ranked[:self.max_candidates]:
+                ratio = difflib.SequenceMatcher(None, h, norm_b[j]).ratio()
+                if ratio > self.threshold:
+                    pairs.append((i, j, ratio))
+        return pairs
+
+    def best_chain(self, pairs, m):
+        """
+        Maximum-weight subset of pairs with strictly increasing i and j.
+        """
+        pairs = sorted(pairs, key=lambda p: (p[0], -p[1]))
+        tree = FenwickMax(m)
+        best = []   # (total, prev index) per pair
+        start = 0
+        while start < len(pairs):
+            # Query every pair of row i before updating, so a row is never used twice
+            end = start
+            while end < len(pairs) and pairs[end][0] == pairs[start][0]:
+                end += 1
+            row = []
+            for k in range(start, end):
+                prev_total, prev_idx = tree.query(pairs[k][1])
+                row.append((k, prev_total + pairs[k][2], prev_idx))
+            for k, total, prev_idx in row:
+                best.append((total, prev_idx))
+                tree.update(pairs[k][1], (total, k))
+            start = end
+
+        _, k = tree.query(m)
+        chain = []
+        while k != -1:
+            chain.append(pairs[k])
+            k = best[k][1]
+        chain.reverse()
+        return chain
+
+    def align(self, sections_a, sections_b):
+        """
+        Returns list of {'section': 'Name', 'text_a': '...', 'text_b': '...'} in document order.
+        Matched sections keep A's header; 'header_b' is added when B's header differs.
+        """
+        headers_a = [s['header'] for s in sections_a]
+        headers_b = [s['header'] for s in sections_b]
+        if not sections_a or not sections_b:
+            chain = []
+        else:
+            chain = self.best_chain(self.candidate_pairs(headers_a, headers_b), len(sections_b))
+
+        aligned = []
+        i = j = 0
+        for mi, mj, _ in chain + [(len(sections_a), len(sections_b), 0.0)]:
+            # Unmatched sections before the next anchor, A's first
+            for s in sections_a[i:mi]:
+                aligned.append(self.entry(s, None))
+            for s in sections_b[j:mj]:
+                aligned.append(self.entry(None, s))
+            if mi < len(sections_a):
+                aligned.append(self.entry(sections_a[mi], sections_b[mj]))
+            i, j = mi + 1, mj + 1
+        return aligned
+
+    def entry(self, a, b):
+        # Tree ids (when the sections came from the chunker) are carried along as id / id_b
+        item = {'section': (a or b)['header'], 'text_a': a['content'] if a else '', 'text_b': b['content'] if b else ''}
+        if a and b and b['header'] != a['header']:
+            item['header_b'] = b['header']
+        if a and a.get('id'): item['id'] = a['id']
+        if b and b.get('id'): item['id_b'] = b['id']
+        # Line numbers of table rows within text_a / text_b (see SectionNode.as_section)
+        if a and a.get('table_rows'): item['table_rows_a'] = a['table_rows']
+        if b and b.get('table_rows'): item['table_rows_b'] = b['table_rows']
+        return item
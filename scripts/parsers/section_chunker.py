@@ -1,5 +1,88 @@
 
 import re
+import hashlib
+import unicodedata
+
+from parsers.section_aligner import SectionAligner
+
+# Leading numbering, stripped from headers when deriving stable section ids
+NUMBERING_RE = re.compile(r'^\s*(?:[（(]?[一二三四五六七八九十百]+[）)]?[、.]?|\d+(?:\.\d+)*[、.]?|第[一二三四五六七八九十百\d]+[章节条])\s*')
+
+def prose_text(text, table_rows):
+    """
+    Section text with its table rows (the 'table_rows' line numbers of as_section) blanked out,
+    so line numbers still hold. Table rows belong to the table comparison, not the prose checks.
+    """
+    if not table_rows or not text: return text or ""
+    lines = text.split('\n')
+    for r in table_rows:
+        if r < len(lines): lines[r] = ""
+    return '\n'.join(lines)
+
+class SectionNode:
+    """
+    One node of the section tree. Offsets index into the shared source text:
+    [start, body_start) is the header line, [body_start, end) the node's own content,
+    [start, subtree_end) the node plus all its descendants. Text is only sliced on access.
+    body_line is the line number of body_start; table_rows the source line numbers of the node's
+    own content that are table rows.
+    """
+    def __init__(self, source, header, kind, start, body_start, parent=None, body_line=0):
+        self.source = source
+        self.header = header
+        self.kind = kind
+        self.start = start
+        self.body_start = body_start
+        self.body_line = body_line
+        self.table_rows = []
+        self.end = len(source)
+        self.subtree_end = len(source)
+        self.parent = parent
+        self.children = []
+        self.level = parent.level + 1 if parent else 0
+        self.id = 'root'
+        self.has_body = False
+        self._digest = None
+
+    @property
+    def content(self):
+        return self.source[self.body_start:self.end].strip()
+
+    @property
+    def subtree_text(self):
+        return self.source[self.start:self.subtree_end]
+
+    @property
+    def digest(self):
+        # Whitespace-insensitive fingerprint of the whole subtree, to skip unchanged chapters
+        if self._digest is None:
+            norm = re.sub(r'\s+', '', unicodedata.normalize('NFKC', self.subtree_text))
+            self._digest = hashlib.sha1(norm.encode('utf-8')).hexdigest()
+        return self._digest
+
+    def walk(self):
+        yield self
+        for c in self.children:
+            yield from c.walk()
+
+    def content_table_rows(self):
+        # Table rows as line numbers within `content` (which starts after the stripped leading whitespace)
+        if not self.table_rows: return []
+        raw = self.source[self.body_start:self.end]
+        first = self.body_line + raw.count('\n', 0, len(raw) - len(raw.lstrip()))
+        return [r - first for r in self.table_rows if r >= first]
+
+    def as_section(self):
+        return {
+            'header': self.header,
+            'content': self.content,
+            'table_rows': self.content_table_rows(),
+            'id': self.id,
+            'level': self.level,
+            'parent': self.parent.id if self.parent else None,
+            'start': self.start,
+            'end': self.end,
+        }
 
 class SectionChunker:
     def __init__(self):
@@ -17,80 +100,125 @@ class SectionChunker:
             re.compile(r'^\s*(关联方|关联交易|控股股东|实际控制人|基本情况|历史沿革).{0,20}$')
         ]
 
-    def is_header(self, line):
+    def is_header(self, line, styled_headers=None):
+        return self.header_kind(line, styled_headers) is not None
+
+    def styled_headers(self, doc):
+        # Heading text -> Word outline level
+        return {p['text'].strip(): p['level'] for p in doc.headings if p['text'].strip()}
+
+    def header_kind(self, line, styled_headers=None):
+        """
+        Returns the kind of header a line is, or None. Kinds are (family, rank); families
+        with a rank (Word heading levels, "1.2.3" depth) nest by rank.
+        """
         line = line.strip()
-        if not line: return False
-        if len(line) > 60: return False # Headers shouldn't be too long
-        
-        for p in self.header_patterns:
+        if not line: return None
+        if styled_headers and line in styled_headers: return ('styled', styled_headers[line])
+        if len(line) > 60: return None # Headers shouldn't be too long
+
+        for idx, p in enumerate(self.header_patterns):
             if p.match(line):
-                return True
-        return False
+                if idx == 3:
+                    return ('dec', re.match(r'\d+(?:\.\d+)*', line).group(0).count('.') + 1)
+                return (idx, 0)
+        return None
 
-    def chunk_text(self, text):
+    def closes(self, open_kind, kind):
+        # Does a new header of `kind` end the open section of `open_kind`?
+        if open_kind[0] != kind[0]: return False
+        if kind[0] in ('styled', 'dec'): return open_kind[1] >= kind[1]
+        return True
+
+    def build_tree(self, text, styled_headers=None, table_lines=None):
         """
-        Splits text into a list of dicts: {'header': '...', 'content': '...'}
+        Builds the nested section tree. table_lines: line numbers of `text` that are table rows
+        (OfficeDocument.table_lines), recorded per node so prose checks can leave them out. Levels are inferred from the order header styles
+        appear in: a header style already open on the stack starts a sibling of that section,
+        an unseen style opens a child of the current one ("（三）" under "五、关联交易").
+        Section ids are stable across revisions: parent id + header without numbering +
+        occurrence index among same-titled siblings.
         """
-        lines = text.split('\n')
-        sections = []
-        current_header = "Intro / Uncategorized"
-        current_content = []
-        
-        for line in lines:
-            if self.is_header(line):
-                # Save previous section
-                if current_content:
-                    sections.append({
-                        'header': current_header, 
-                        'content': '\n'.join(current_content).strip()
-                    })
-                
-                # Start new section
-                current_header = line.strip()
-                current_content = []
+        root = SectionNode(text, "Intro / Uncategorized", None, 0, 0)
+        stack = [root]
+        seen = {}
+        offset = 0
+        current = root
+
+        for n, line in enumerate(text.split('\n')):
+            line_end = offset + len(line)
+            kind = self.header_kind(line, styled_headers)
+            if kind:
+                current.end = offset
+                for depth in range(len(stack) - 1, 0, -1):
+                    if self.closes(stack[depth].kind, kind):
+                        for closed in stack[depth:]: closed.subtree_end = offset
+                        del stack[depth:]
+                        break
+                parent = stack[-1]
+                node = SectionNode(text, line.strip(), kind, offset, min(line_end + 1, len(text)), parent, n + 1)
+                title = NUMBERING_RE.sub('', unicodedata.normalize('NFKC', node.header)) or node.header
+                n = seen.get((parent.id, title), 0)
+                seen[(parent.id, title)] = n + 1
+                node.id = hashlib.sha1(f"{parent.id}/{title}/{n}".encode('utf-8')).hexdigest()[:12]
+                parent.children.append(node)
+                stack.append(node)
+                current = node
             else:
-                current_content.append(line)
-                
-        # Append last section
-        if current_content:
-            sections.append({
-                'header': current_header,
-                'content': '\n'.join(current_content).strip()
-            })
-            
-        return sections
+                current.has_body = True
+                if table_lines and n in table_lines: current.table_rows.append(n)
+            offset = line_end + 1
+
+        return root
+
+    def chunk_text(self, text, styled_headers=None):
+        """
+        Splits text into a flat list of dicts: {'header': '...', 'content': '...'}, plus the
+        tree position of each section ('id', 'level', 'parent', 'start', 'end').
+        """
+        root = self.build_tree(text, styled_headers)
+        return [n.as_section() for n in root.walk() if n.has_body]
+
+    def align_trees(self, root_a, root_b):
+        """
+        Aligns two section trees chapter by chapter. Matched subtrees that are unchanged
+        collapse into a single entry flagged 'unchanged' (at any depth); changed ones are
+        descended into, and unmatched runs are aligned section by section as in align_sections.
+        """
+        return self.align_nodes(root_a, root_b, SectionAligner())
+
+    def align_nodes(self, node_a, node_b, aligner):
+        def flat(nodes):
+            return [n.as_section() for top in nodes for n in top.walk() if n.has_body]
+
+        # The two nodes' own content first, then their children
+        # (the caller already matched them, so no header scoring here)
+        own_a = node_a.as_section() if node_a.has_body else None
+        own_b = node_b.as_section() if node_b.has_body else None
+        aligned = [aligner.entry(own_a, own_b)] if (own_a or own_b) else []
+
+        kids_a, kids_b = node_a.children, node_b.children
+        chain = []
+        if kids_a and kids_b:
+            pairs = aligner.candidate_pairs([n.header for n in kids_a], [n.header for n in kids_b])
+            chain = aligner.best_chain(pairs, len(kids_b))
+
+        i = j = 0
+        for mi, mj, _ in chain + [(len(kids_a), len(kids_b), 0.0)]:
+            aligned.extend(aligner.align(flat(kids_a[i:mi]), flat(kids_b[j:mj])))
+            if mi < len(kids_a):
+                a, b = kids_a[mi], kids_b[mj]
+                if a.digest == b.digest:
+                    aligned.append({'section': a.header, 'text_a': a.subtree_text.strip(),
+                                    'text_b': b.subtree_text.strip(), 'id': a.id, 'id_b': b.id, 'unchanged': True})
+                else:
+                    aligned.extend(self.align_nodes(a, b, aligner))
+            i, j = mi + 1, mj + 1
+        return aligned
 
     def align_sections(self, sections_a, sections_b):
         """
-        Aligns sections from two docs based on header similarity.
+        Aligns sections from two docs based on header similarity, keeping document order.
         Returns: list of {'section': 'Name', 'text_a': '...', 'text_b': '...'}
         """
-        aligned_map = {} # Header -> {a: ..., b: ...}
-        
-        # 1. Map A
-        for s in sections_a:
-            h = s['header']
-            aligned_map[h] = {'section': h, 'text_a': s['content'], 'text_b': ''}
-            
-        # 2. Map B (Try to find fuzzy match in A, else new)
-        import difflib
-        
-        for s in sections_b:
-            h_b = s['header']
-            # Find best match in existing keys
-            best_match = None
-            best_ratio = 0.0
-            
-            for h_a in aligned_map.keys():
-                ratio = difflib.SequenceMatcher(None, h_a, h_b).ratio()
-                if ratio > best_ratio:
-                    best_ratio = ratio
-                    best_match = h_a
-            
-            if best_ratio > 0.6: # Threshold for "Same Section"
-                aligned_map[best_match]['text_b'] = s['content']
-                # Append header to section name if different for clarity? No, keep A's name
-            else:
-                aligned_map[h_b] = {'section': h_b, 'text_a': '', 'text_b': s['content']}
-                
-        return list(aligned_map.values())
+        return SectionAligner().align(sections_a, sections_b)
@@ -0,0 +1,94 @@
+
+import re
+import unicodedata
+
+from parsers.section_chunker import NUMBERING_RE, prose_text
+from utils.minhash import MinHasher, LSHIndex, shingles, jaccard
+from utils.assignment import solve_assignment
+
+class MoveDetector:
+    """
+    Content-based pairing of the sections header alignment left unmatched.
+    A block moved from "关联交易" to "同业竞争", or a retitled section, comes out of header
+    alignment as one A-only and one B-only entry. Their character shingles are MinHashed and
+    B-only sections indexed with LSH, so each A-only section is compared only with its LSH
+    candidates (near-linear, no all-pairs: LSH buckets and queries are capped, see LSHIndex).
+    Only the prose is shingled: table rows (table_rows_a / table_rows_b) are blanked first, so
+    two sections sharing a table are not taken for a move.
+    Candidates are scored by exact shingle Jaccard and assigned one-to-one (greedily for large
+    candidate groups); each pair becomes one entry flagged
+    'match': 'renamed' (same parent chapter, new or renumbered header) or 'moved' (anything else),
+    with 'moved_from' / 'moved_to' = parent headers and 'similarity'.
+    """
+    MIN_CHARS = 20 # Shorter sections have too few shingles to tell a move from a coincidence
+    MAX_DENSE = 2500 # Candidate groups above rows x columns are assigned greedily, not by Hungarian
+
+    def __init__(self, threshold=0.5, shingle=5, num_perm=64, bands=16):
+        self.threshold = threshold
+        self.shingle = shingle
+        self.minhasher = MinHasher(num_perm)
+        self.num_perm = num_perm
+        self.bands = bands
+
+    def detect(self, aligned, root_a=None, root_b=None):
+        """
+        aligned: SectionChunker.align_trees / align_sections output.
+        root_a / root_b: the section trees, used to name the parent chapters (optional).
+        Returns a new aligned list; paired entries sit at the A-side position.
+        """
+        prose_a = {k: prose_text(s['text_a'], s.get('table_rows_a')).strip()
+                   for k, s in enumerate(aligned) if s.get('text_a') and not s.get('text_b')}
+        prose_b = {k: prose_text(s['text_b'], s.get('table_rows_b')).strip()
+                   for k, s in enumerate(aligned) if s.get('text_b') and not s.get('text_a')}
+        only_a = [k for k, t in prose_a.items() if len(t) >= self.MIN_CHARS]
+        only_b = [k for k, t in prose_b.items() if len(t) >= self.MIN_CHARS]
+        if not only_a or not only_b: return aligned
+
+        sh_b = {k: shingles(prose_b[k], self.shingle) for k in only_b}
+        index = LSHIndex(self.num_perm, self.bands)
+        for k, h in sh_b.items():
+            index.add(k, self.minhasher.signature(h))
+
+        scores = {}
+        for k in only_a:
+            h = shingles(prose_a[k], self.shingle)
+            for kb in index.query(self.minhasher.signature(h)):
+                score = jaccard(h, sh_b[kb])
+                if score >= self.threshold:
+                    scores[(k, kb)] = score
+        if not scores: return aligned
+
+        parents_a = self.parent_headers(root_a)
+        parents_b = self.parent_headers(root_b)
+        merged = {}
+        dropped = set()
+        for ka, kb, score in solve_assignment(scores, self.MAX_DENSE):
+            a, b = aligned[ka], aligned[kb]
+            item = {'section': a['section'], 'text_a': a['text_a'], 'text_b': b['text_b']}
+            if b['section'] != a['section']: item['header_b'] = b['section']
+            if a.get('id'): item['id'] = a['id']
+            if b.get('id_b'): item['id_b'] = b['id_b']
+            if a.get('table_rows_a'): item['table_rows_a'] = a['table_rows_a']
+            if b.get('table_rows_b'): item['table_rows_b'] = b['table_rows_b']
+
+            moved_from = parents_a.get(a.get('id'), "")
+            moved_to = parents_b.get(b.get('id_b'), "")
+            renamed = self.title(moved_from) == self.title(moved_to) and a['section'] != b['section']
+            item['match'] = 'renamed' if renamed else 'moved'
+            item['moved_from'] = moved_from
+            item['moved_to'] = moved_to
+            item['similarity'] = round(score, 3)
+            merged[ka] = item
+            dropped.add(kb)
+
+        return [merged.get(k, s) for k, s in enumerate(aligned) if k not in dropped]
+
+    def parent_headers(self, root):
+        # Section id -> header of its parent chapter ("" at top level)
+        if root is None: return {}
+        return {n.id: (n.parent.header if n.parent and n.parent.parent else "") for n in root.walk()}
+
+    def title(self, header):
+        # Header without its numbering: "三、关联交易" and "四、关联交易" are the same chapter
+        header = unicodedata.normalize('NFKC', header or "")
+        return re.sub(r'\s+', '', NUMBERING_RE.sub('', header))
@@ -0,0 +1,162 @@
+
+import re
+import json
+
+# Keyword profiles per document genre.
+# header_keywords: words typical of header cells; key_keywords: headers that usually identify a row.
+PROFILES = {
+    'default': {
+        'header_keywords': ["名称", "号", "金额", "日期", "人", "项目", "类型", "比例", "数量"],
+        'key_keywords': ["专利号", "合同编号", "证书号", "编号", "名称"],
+    },
+    'financial': {
+        'header_keywords': ["项目", "科目", "期末", "期初", "本期", "上期", "余额", "金额", "发生额", "比例", "占比", "年度", "合计"],
+        'key_keywords': ["项目", "科目", "名称"],
+    },
+    'legal': {
+        'header_keywords': ["名称", "号", "当事人", "合同", "专利", "证书", "权利人", "期限", "面积", "坐落", "用途", "日期"],
+        'key_keywords': ["专利号", "合同编号", "证书号", "权证号", "登记号", "编号", "名称"],
+    },
+}
+
+NUM_RE = re.compile(r'^[-+]?[\d,，]+(?:\.\d+)?\s*(?:%|万元|亿元|元|万股|股)?$')
+DATE_RE = re.compile(r'\d{4}\s*[年.\-/]\s*\d{1,2}')
+
+def load_profile(name_or_path):
+    """
+    A built-in profile name, or a JSON file with 'header_keywords' / 'key_keywords'.
+    """
+    if not name_or_path:
+        return PROFILES['default']
+    if name_or_path in PROFILES:
+        return PROFILES[name_or_path]
+    with open(name_or_path, 'r', encoding='utf-8') as f:
+        custom = json.load(f)
+    profile = dict(PROFILES['default'])
+    profile.update({k: v for k, v in custom.items() if k in ('header_keywords', 'key_keywords')})
+    return profile
+
+def cell_type(c):
+    if not c or c in ('-', '—', '/'): return 'empty'
+    if NUM_RE.match(c): return 'num'
+    if DATE_RE.search(c) and len(c) <= 20: return 'date'
+    return 'text'
+
+class TableDetector:
+    """
+    Header-row and primary-key detection for raw tables.
+    - Header rows are scored on the first few rows: share of text cells, keyword hits from the
+      profile, distinct cells, and the type change to the rows below (text header over numeric
+      or date columns). A second header row under a merged (spanned) first row is folded in.
+    - Primary keys are chosen from per-column statistics gathered in one pass over the columns:
+      uniqueness and non-null ratio, with a bonus for the profile's key keywords and a penalty
+      for numeric columns (amounts are often unique but never identify a row).
+    """
+    MAX_HEADER_ROW = 6
+    MIN_HEADER_SCORE = 0.45
+
+    def __init__(self, profile=None):
+        self.profile = profile or PROFILES['default']
+
+    def header_score(self, table, i):
+        row = table[i]
+        types = [cell_type(c) for c in row]
+        filled = [c for c, t in zip(row, types) if t != 'empty']
+        if not filled or (len(filled) < 2 and len(row) > 1): return 0.0
+
+        text_ratio = sum(1 for t in types if t == 'text') / len(filled)
+        keywords = self.profile['header_keywords']
+        kw_ratio = sum(1 for c in filled if any(k in c for k in keywords)) / len(filled)
+        distinct = len(set(filled)) / len(filled)
+
+        # Type change: text header cell above a column that is mostly numbers / dates below
+        below = table[i + 1:i + 6]
+        changes = 0
+        for k, t in enumerate(types):
+            if t != 'text': continue
+            col_types = [cell_type(r[k]) for r in below if k < len(r)]
+            typed = [ct for ct in col_types if ct != 'empty']
+            if typed and sum(1 for ct in typed if ct in ('num', 'date')) * 2 > len(typed):
+                changes += 1
+        change_ratio = changes / len(filled)
+
+        return 0.35 * text_ratio + 0.3 * kw_ratio + 0.1 * distinct + 0.25 * min(1.0, change_ratio * 2)
+
+    def detect_header(self, table):
+        """
+        Returns (headers, index of the first data row), or (None, -1) for tables without a header.
+        """
+        if len(table) < 2: return None, -1
+        best_i, best_score = -1, 0.0
+        for i in range(min(self.MAX_HEADER_ROW, len(table) - 1)):
+            score = self.header_score(table, i)
+            if score > best_score + 1e-9:
+                best_i, best_score = i, score
+        if best_i == -1 or best_score < self.MIN_HEADER_SCORE:
+            return None, -1
+
+        # Two-row header: a spanned group row ("2023年" over "金额" / "占比") above a text-only row.
+        # The best-scoring row may be either of the two.
+        top = best_i
+        if best_i > 0 and self.is_group_row(table[best_i - 1], table[best_i]):
+            top = best_i - 1
+        elif best_i + 2 < len(table) and self.is_group_row(table[best_i], table[best_i + 1]):
+            top = best_i
+        else:
+            return list(table[best_i]), best_i + 1
+        headers = [self.merge_header(h, s) for h, s in zip(table[top], table[top + 1])]
+        return headers, top + 2
+
+    def is_group_row(self, row, nxt):
+        if len(row) != len(nxt): return False
+        if not all(cell_type(c) in ('text', 'empty') for c in row + nxt): return False
+        return any(row[k] and row[k] == row[k + 1] for k in range(len(row) - 1))
+
+    def merge_header(self, top, sub):
+        if not sub or sub == top: return top
+        if not top: return sub
+        return f"{top}{sub}"
+
+    def column_stats(self, headers, rows):
+        """
+        One pass per column: non-null ratio, uniqueness ratio and numeric ratio.
+        """
+        n = len(rows)
+        stats = []
+        for h in dict.fromkeys(headers):
+            values = [r.get(h, "") for r in rows]
+            filled = [v for v in values if v and v not in ('-', '—', '/')]
+            nonnull = len(filled) / n if n else 0.0
+            unique = len(set(filled)) / len(filled) if filled else 0.0
+            numeric = sum(1 for v in filled if NUM_RE.match(v)) / len(filled) if filled else 0.0
+            stats.append({'header': h, 'nonnull': nonnull, 'unique': unique, 'numeric': numeric})
+        return stats
+
+    def detect_primary_key(self, headers, rows):
+        if not headers or not rows:
+            return ["__col_0"]
+
+        stats = self.column_stats(headers, rows)
+        key_keywords = self.profile['key_keywords']
+
+        def score(s):
+            h = s['header']
+            bonus = 0.0
+            for rank, kw in enumerate(key_keywords):
+                if kw in h:
+                    bonus = 0.3 - 0.02 * rank
+                    break
+            if "客户" in h or "供应商" in h: bonus -= 0.1 # Counterparty, not the object itself
+            return s['unique'] * s['nonnull'] + bonus - 0.5 * s['numeric']
+
+        ranked = sorted(stats, key=score, reverse=True)
+        best = ranked[0]
+        if best['unique'] >= 0.9 or len(ranked) == 1:
+            return [best['header']]
+
+        # No single identifying column: combine the two best if together they are unique
+        second = ranked[1]
+        combo = {(r.get(second['header'], ""), r.get(best['header'], "")) for r in rows}
+        if len(combo) > best['unique'] * len(rows):
+            return [second['header'], best['header']]
+        return [best['header']]
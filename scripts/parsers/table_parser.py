@@ -3,98 +3,165 @@ import re
 from html.parser import HTMLParser
 import html
 
+from parsers.table_detect import TableDetector
+
 class HTMLTableParser(HTMLParser):
+    """
+    Incremental table extractor: feed() it chunks of HTML and drain() the tables completed so far.
+    - A table stack keeps nested tables apart (each one is emitted as its own table).
+    - rowspan / colspan are expanded into a dense grid: a merged cell's text is repeated in
+      every grid position it covers, so columns never drift.
+    """
     def __init__(self):
         super().__init__()
-        self.tables = []
-        self.current_table = []
-        self.current_row = []
-        self.current_cell = []
-        self.in_cell = False
+        self.stack = []
+        self.completed = []
     
     def handle_starttag(self, tag, attrs):
         if tag == 'table':
-            self.current_table = []
-        elif tag == 'tr':
-            self.current_row = []
+            # rowspans: grid column -> [text, rows still covered]
+            self.stack.append({'rows': [], 'row': None, 'cell': None, 'span': (1, 1), 'rowspans': {}})
+            return
+        if not self.stack: return
+        t = self.stack[-1]
+        if tag == 'tr':
+            self.end_row(t) # Tolerate a missing </tr>
+            t['row'] = []
         elif tag == 'td' or tag == 'th':
-            self.in_cell = True
-            self.current_cell = []
+            if t['row'] is None: t['row'] = []
+            self.end_cell(t) # Tolerate a missing </td>
+            a = dict(attrs)
+            t['cell'] = []
+            t['span'] = (self.span_value(a.get('rowspan')), self.span_value(a.get('colspan')))
+        elif tag == 'br' and t['cell'] is not None:
+            t['cell'].append("\n")
             
     def handle_endtag(self, tag):
+        if not self.stack: return
+        t = self.stack[-1]
         if tag == 'table':
-            if self.current_table: self.tables.append(self.current_table)
+            self.end_row(t)
+            self.stack.pop()
+            if t['rows']: self.completed.append(t['rows'])
         elif tag == 'tr':
-            if self.current_row: self.current_table.append(self.current_row)
+            self.end_row(t)
         elif tag == 'td' or tag == 'th':
-            self.in_cell = False
-            self.current_row.append("".join(self.current_cell).strip())
+            self.end_cell(t)
             
     def handle_data(self, data):
-        if self.in_cell:
-            self.current_cell.append(data)
+        if self.stack and self.stack[-1]['cell'] is not None:
+            self.stack[-1]['cell'].append(data)
+
+    def span_value(self, v):
+        try:
+            return max(1, min(int(v), 1000))
+        except (TypeError, ValueError):
+            return 1
+
+    def fill_rowspans(self, t):
+        # Grid positions at the current column still covered by a rowspan from above
+        row = t['row']
+        while len(row) in t['rowspans']:
+            col = len(row)
+            text, left = t['rowspans'][col]
+            row.append(text)
+            if left <= 1: del t['rowspans'][col]
+            else: t['rowspans'][col] = [text, left - 1]
+
+    def end_cell(self, t):
+        if t['cell'] is None or t['row'] is None: return
+        text = "".join(t['cell']).strip()
+        rowspan, colspan = t['span']
+        self.fill_rowspans(t)
+        for _ in range(colspan):
+            col = len(t['row'])
+            t['row'].append(text)
+            if rowspan > 1: t['rowspans'][col] = [text, rowspan - 1]
+            self.fill_rowspans(t)
+        t['cell'] = None
+
+    def end_row(self, t):
+        if t['row'] is None: return
+        self.end_cell(t)
+        # Trailing positions covered from above
+        if t['rowspans'] and max(t['rowspans']) >= len(t['row']):
+            self.fill_rowspans(t)
+            while t['rowspans'] and max(t['rowspans']) >= len(t['row']):
+                t['row'].append("")
+                self.fill_rowspans(t)
+        if t['row']: t['rows'].append(t['row'])
+        t['row'] = None
+
+    def drain(self):
+        done, self.completed = self.completed, []
+        return done
+
+def iter_html_tables(html_path, chunk_size=1 << 16):
+    """
+    Streams raw tables (lists of rows) out of an HTML file, reading it in chunks,
+    so memory stays flat and callers can start on the first table right away.
+    """
+    parser = HTMLTableParser()
+    with open(html_path, 'r', encoding='utf-8', errors='replace') as f:
+        for chunk in iter(lambda: f.read(chunk_size), ''):
+            parser.feed(chunk)
+            yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
 
 class TableParser:
-    def parse(self, html_path):
-        with open(html_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        parser = HTMLTableParser()
-        parser.feed(content)
-        
-        # Process tables into keyed dictionaries
-        processed_tables = []
+    def __init__(self, profile=None):
+        # profile: keyword profile for header / key detection (see table_detect.PROFILES)
+        self.detector = TableDetector(profile)
+
+    def parse(self, source):
+        """
+        source: an OfficeDocument (tables already extracted) or a path to an HTML export.
+        """
+        return list(self.iter_parse(source))
+
+    def iter_parse(self, source):
+        """
+        Generator version of parse: yields processed tables one at a time.
+        """
+        raw_tables = iter_html_tables(source) if isinstance(source, str) else source.tables
+        for table in raw_tables:
+            processed = self.process_table(table)
+            if processed: yield processed
+
+    def process_table(self, table):
+        if not table: return None
         
-        for table in parser.tables:
-            if not table: continue
+        clean = [[self.normalize(c) for c in row] for row in table]
+        # Identify headers (possibly two rows deep); tables without one are skipped
+        headers, data_start = self.detector.detect_header(clean)
+        if headers is None:
+            return None
             
-            # Identify headers
-            # Heuristic: First row that has meaningful columns
-            header_idx = -1
-            headers = []
-            
-            for i, row in enumerate(table[:5]):
-                # Only text
-                clean_row = [self.normalize(c) for c in row]
-                # If row has keywords
-                s = "".join(clean_row)
-                if len(s) > 5 and ("名称" in s or "号" in s or "金额" in s or "日期" in s or "人" in s):
-                    header_idx = i
-                    headers = clean_row
-                    break
-            
-            if header_idx == -1:
-                # Treat as generic list? Skip for now validation
-                continue
-                
-            # Convert rows to dicts
-            rows_data = []
-            last_valid_row = {} # For merging support
-            
-            for row in table[header_idx+1:]:
-                if not any(row): continue
-                
-                item = {}
-                # Map by header name (approx) or index
-                # We store both index-based and header-key based
-                for k, cell in enumerate(row):
-                    if k < len(headers):
-                        h_name = headers[k]
-                        item[h_name] = self.normalize(cell)
-                        item[f"__col_{k}"] = self.normalize(cell)
-                
-                rows_data.append(item)
-            
-            # Detect primary key for this table
-            pk = self.detect_primary_key(headers, rows_data)
+        # Convert rows to dicts
+        rows_data = []
+        
+        for row in clean[data_start:]:
+            if not any(row): continue
             
-            processed_tables.append({
-                "headers": headers,
-                "rows": rows_data,
-                "pk": pk
-            })
+            item = {}
+            # Map by header name (approx) or index
+            # We store both index-based and header-key based
+            for k, cell in enumerate(row):
+                if k < len(headers):
+                    item[headers[k]] = cell
+                    item[f"__col_{k}"] = cell
             
-        return processed_tables
+            rows_data.append(item)
+        
+        # Detect primary key for this table
+        pk = self.detect_primary_key(headers, rows_data)
+        
+        return {
+            "headers": headers,
+            "rows": rows_data,
+            "pk": pk
+        }
 
     def normalize(self, text):
         if not text: return ""
@@ -103,24 +170,5 @@ class TableParser:
         return text
 
     def detect_primary_key(self, headers, rows):
-        # Prefer: Patent No, Contract No, or Combined (Party + Name)
-        possible_pks = []
-        
-        for h in headers:
-            if "专利号" in h or "合同编号" in h or "证书号" in h:
-                return [h]
-        
-        # If no explicit ID, look for Name/Party
-        name_col = None
-        party_col = None
-        
-        for h in headers:
-            if "名称" in h and "客户" not in h and "供应商" not in h: name_col = h
-            if "客户" in h or "供应商" in h or "当事人" in h or "对象" in h: party_col = h
-            
-        if name_col and party_col:
-            return [party_col, name_col]
-        if name_col:
-            return [name_col]
-            
-        return ["__col_0"] # Fallback to first column
+        # Column uniqueness / fill ratio, with the profile's ID-like headers preferred
+        return self.detector.detect_primary_key(headers, rows)
@@ -3,7 +3,7 @@ import os
 import datetime
 
 class MDReporter:
-    def generate(self, diff_report, issues1, issues2, f1_path, f2_path, llm_insights=None):
+    def generate(self, diff_report, issues1, issues2, f1_path, f2_path, llm_insights=None, text_diffs=None, entity_conflicts=None, aligned=None):
         lines = []
         name1 = os.path.basename(f1_path)
         name2 = os.path.basename(f2_path)
@@ -16,12 +16,15 @@ class MDReporter:
         if llm_insights:
             lines.append("## 🤖 AI 智能洞察 (LLM Insights)")
             for insight in llm_insights:
+                if insight.get('section'):
+                    lines.append(f"### {insight['section']}")
                 lines.append(f"**总体评价**: {insight.get('summary', '发现差异')}")
                 lines.append(f"")
                 lines.append(f"| 差异点 | {name1} | {name2} | 潜在风险 |")
                 lines.append(f"| :--- | :--- | :--- | :--- |")
                 for d in insight.get('details', []):
                     lines.append(f"| {d.get('item')} | {d.get('doc_a')} | {d.get('doc_b')} | {d.get('risk')} |")
+                lines.append(f"")
             lines.append(f"")
             lines.append(f"---")
             lines.append(f"")
@@ -36,6 +39,11 @@ class MDReporter:
             has_table_diff = True
             lines.append(f"### {table_diff['title']}")
             
+            unmapped = table_diff.get('unmapped_columns')
+            if unmapped:
+                if unmapped['file1']: lines.append(f"**ℹ️ 仅在 {name1} 中存在的列:** {', '.join(unmapped['file1'])}")
+                if unmapped['file2']: lines.append(f"**ℹ️ 仅在 {name2} 中存在的列:** {', '.join(unmapped['file2'])}")
+            
             if table_diff['missing_in_file1']:
                 lines.append(f"**🔴 仅在 {name2} 中存在:**")
                 for m in table_diff['missing_in_file1']: lines.append(f"- {m}")
@@ -50,6 +58,8 @@ class MDReporter:
                 lines.append(f"| :--- | :--- | :--- | :--- |")
                 for r in table_diff['row_diffs']:
                     key = r['key']
+                    if r.get('confidence', 1.0) < 1.0:
+                        key = f"{key} (匹配度 {r['confidence']:.2f})"
                     for d in r['diffs']:
                         lines.append(f"| {key} | {d['field']} | {d['v1']} | {d['v2']} |")
             lines.append("")
@@ -57,8 +67,33 @@ class MDReporter:
         if not has_table_diff:
             lines.append("✅ 表格数据一致。")
 
-        # 2. Logic Checks
-        lines.append("## 2. 🧠 深度逻辑与合规性检查")
+        # 2. Prose Diffs
+        lines.append("## 2. 📝 正文差异 (章节)")
+        moves = [s for s in (aligned or []) if s.get('match')]
+        if moves:
+            lines.append("### 🔀 移动/重命名的章节")
+            lines.append(f"| 类型 | {name1} | {name2} | 位置 | 内容相似度 |")
+            lines.append(f"| :--- | :--- | :--- | :--- | ---: |")
+            for m in moves:
+                kind = "重命名" if m['match'] == 'renamed' else "移动"
+                where = f"{m['moved_from'] or '顶层'} → {m['moved_to'] or '顶层'}" if m['moved_from'] != m['moved_to'] else (m['moved_from'] or '顶层')
+                lines.append(f"| {kind} | {self.cell(m['section'], 40)} | {self.cell(m.get('header_b', m['section']), 40)} | {self.cell(where, 80)} | {m['similarity']:.2f} |")
+            lines.append("")
+        if entity_conflicts:
+            lines.append("### 🔢 数字与日期冲突")
+            lines.append(f"| 章节 | 上下文 | {name1} | {name2} |")
+            lines.append(f"| :--- | :--- | :--- | :--- |")
+            for c in entity_conflicts:
+                lines.append(f"| {self.cell(c['section'], 40)} | {self.cell(c['key'], 20)} | {self.cell(c['a'])} | {self.cell(c['b'])} |")
+            lines.append("")
+        if text_diffs:
+            lines.extend(self.text_diff_lines(text_diffs, name1, name2))
+        else:
+            lines.append("✅ 正文内容一致。")
+        lines.append("")
+
+        # 3. Logic Checks
+        lines.append("## 3. 🧠 深度逻辑与合规性检查")
         
         lines.append(f"### 📄 文件 1: {name1}")
         if issues1:
@@ -89,3 +124,92 @@ class MDReporter:
             f.write("\n".join(lines))
             
         return output_path
+
+    def text_diff_lines(self, text_diffs, name1, name2, max_ops=50):
+        lines = []
+        labels = {'insert': '新增', 'delete': '删除', 'replace': '修改'}
+        for d in text_diffs:
+            lines.append(f"### {d['section']}")
+            if d['status'] == 'added':
+                lines.append(f"**🔴 仅在 {name2} 中存在:** {self.cell(d['ops'][0]['b'], 200)}")
+                lines.append("")
+                continue
+            if d['status'] == 'removed':
+                lines.append(f"**🔴 仅在 {name1} 中存在:** {self.cell(d['ops'][0]['a'], 200)}")
+                lines.append("")
+                continue
+            lines.append(f"| 变更 | 上下文 | {name1} | {name2} |")
+            lines.append(f"| :--- | :--- | :--- | :--- |")
+            for op in d['ops'][:max_ops]:
+                lines.append(f"| {labels[op['op']]} | …{self.cell(op.get('context', ''), 20)} | {self.cell(op['a'])} | {self.cell(op['b'])} |")
+            if len(d['ops']) > max_ops:
+                lines.append(f"")
+                lines.append(f"*… 另有 {len(d['ops']) - max_ops} 处差异*")
+            lines.append("")
+        return lines
+
+    def cell(self, text, limit=120):
+        # One markdown table cell: no pipes, no raw newlines, bounded length
+        text = text or ""
+        if len(text) > limit: text = text[:limit] + "…"
+        return text.replace("|", "\\|").replace("\n", "<br>").replace("\t", " ")
+
+    def generate_batch_summary(self, results, output_dir, unmatched=None):
+        lines = []
+        lines.append("# 📂 批量比对汇总 (Batch Summary)")
+        lines.append(f"> 生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append("")
+        
+        ok = [r for r in results if r['status'] == 'ok']
+        failed = [r for r in results if r['status'] != 'ok']
+        total_secs = sum(r.get('seconds', 0.0) for r in results)
+        lines.append(f"- 比对文件对: {len(results)} (成功 {len(ok)}, 失败 {len(failed)})")
+        lines.append(f"- 累计耗时: {total_secs:.1f}s")
+        if unmatched:
+            lines.append(f"- 未匹配文件: {len(unmatched)}")
+        lines.append("")
+        
+        lines.append("| 文件 1 | 文件 2 | 状态 | 耗时 (s) | 报告 / 错误 |")
+        lines.append("| :--- | :--- | :--- | ---: | :--- |")
+        for r in results:
+            status = "✅" if r['status'] == 'ok' else "❌"
+            detail = os.path.basename(r['report']) if r.get('report') else (r.get('error') or "")
+            lines.append(f"| {os.path.basename(r['file1'])} | {os.path.basename(r['file2'])} | {status} | {r.get('seconds', 0.0):.1f} | {detail} |")
+        
+        if unmatched:
+            lines.append("")
+            lines.append("## ⚠️ 未匹配文件")
+            for f in unmatched: lines.append(f"- {os.path.basename(f)}")
+        
+        output_path = os.path.join(output_dir, "Batch_Summary.md")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+            
+        return output_path
+
+    def generate_pairing_report(self, pairs, unmatched1, unmatched2, output_dir):
+        lines = []
+        lines.append("# 🔗 批量配对报告 (Pairing Report)")
+        lines.append(f"> 生成时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        lines.append("")
+        lines.append(f"- 已配对: {len(pairs)}")
+        lines.append(f"- 文件夹 1 未匹配: {len(unmatched1)}")
+        lines.append(f"- 文件夹 2 未匹配: {len(unmatched2)}")
+        lines.append("")
+        
+        lines.append("| 文件 1 | 文件 2 | 相似度 |")
+        lines.append("| :--- | :--- | ---: |")
+        for f1, f2, score in pairs:
+            lines.append(f"| {os.path.basename(f1)} | {os.path.basename(f2)} | {score:.2f} |")
+        
+        for title, files in (("文件夹 1 未匹配文件", unmatched1), ("文件夹 2 未匹配文件", unmatched2)):
+            if not files: continue
+            lines.append("")
+            lines.append(f"## ⚠️ {title}")
+            for f in files: lines.append(f"- {os.path.basename(f)}")
+        
+        output_path = os.path.join(output_dir, "Pairing_Report.md")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+            
+        return output_path
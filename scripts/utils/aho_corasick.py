@@ -0,0 +1,55 @@
+
+from collections import deque
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher: all patterns are found in one left-to-right pass over the text,
+    in time linear in the text length plus the number of matches.
+    Built once from the pattern list; goto transitions are plain dicts per state.
+    """
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]] # state -> pattern indices ending here (including via fail links)
+
+        for idx, p in enumerate(self.patterns):
+            state = 0
+            for ch in p:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(idx)
+
+        # Breadth-first fail links; outputs are merged along them
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def iter(self, text):
+        """
+        Yields (start, end, pattern) for every occurrence, overlapping ones included, by end offset.
+        """
+        if not self.patterns: return
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                p = patterns[idx]
+                yield i + 1 - len(p), i + 1, p
@@ -0,0 +1,132 @@
+
+# Global one-to-one assignment (Hungarian / Kuhn-Munkres) over sparse score maps.
+# Shared by file pairing and table matching.
+
+INF = float('inf')
+
+def hungarian(cost):
+    """
+    Min-cost assignment on a dense n x m matrix with n <= m.
+    Returns assign[i] = column for every row i. O(n^2 * m).
+    """
+    n = len(cost)
+    if n == 0: return []
+    m = len(cost[0])
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)   # p[j] = row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if used[j]: continue
+                cur = row[j - 1] - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0: break
+        while True:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+            if j0 == 0: break
+
+    assign = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]: assign[p[j] - 1] = j - 1
+    return assign
+
+def greedy_assignment(scores):
+    """
+    One-to-one matching taking the best remaining pair first. O(K log K) for K candidates;
+    not optimal, but close when scores are well separated.
+    """
+    used_i, used_j = set(), set()
+    result = []
+    for (i, j), s in sorted(scores.items(), key=lambda kv: (-kv[1], kv[0])):
+        if i in used_i or j in used_j: continue
+        used_i.add(i)
+        used_j.add(j)
+        result.append((i, j, s))
+    result.sort()
+    return result
+
+def solve_assignment(scores, max_component=None):
+    """
+    Maximum-total-score one-to-one matching.
+    scores: {(i, j): score > 0} for candidate pairs only (absent pairs cannot be matched).
+    The candidate graph is split into connected components and each component is
+    solved separately, so sparse inputs stay cheap.
+    max_component: components with more rows x columns than this are matched greedily
+    instead of with the dense O(n^2 * m) Hungarian solver.
+    Returns a list of (i, j, score).
+    """
+    if not scores: return []
+
+    # Union-find over row / column nodes
+    parent = {}
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for i, j in scores:
+        ra, rb = find(('r', i)), find(('c', j))
+        if ra != rb: parent[ra] = rb
+
+    components = {}
+    for i, j in scores:
+        root = find(('r', i))
+        comp = components.setdefault(root, (set(), set(), []))
+        comp[0].add(i)
+        comp[1].add(j)
+        comp[2].append((i, j))
+
+    result = []
+    for rows, cols, pairs in components.values():
+        if max_component and len(rows) * len(cols) > max_component:
+            result.extend(greedy_assignment({p: scores[p] for p in pairs}))
+            continue
+        rows = sorted(rows)
+        cols = sorted(cols)
+        transpose = len(rows) > len(cols)
+        if transpose: rows, cols = cols, rows
+
+        # Non-candidate cells cost 0 ("leave unmatched"), candidates cost -score
+        cost = []
+        for a in rows:
+            line = []
+            for b in cols:
+                s = scores.get((b, a) if transpose else (a, b))
+                line.append(-s if s else 0.0)
+            cost.append(line)
+
+        for r_idx, c_idx in enumerate(hungarian(cost)):
+            if c_idx < 0: continue
+            a, b = rows[r_idx], cols[c_idx]
+            i, j = (b, a) if transpose else (a, b)
+            s = scores.get((i, j))
+            if s: result.append((i, j, s))
+
+    result.sort()
+    return result
@@ -0,0 +1,82 @@
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+def run_timed(worker, f1, f2):
+    """
+    Runs one pair and never raises: the outcome is returned as a result dict.
+    """
+    start = time.perf_counter()
+    result = {'file1': f1, 'file2': f2, 'status': 'ok', 'report': None, 'error': None}
+    try:
+        result['report'] = worker(f1, f2)
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+class BatchRunner:
+    """
+    Spreads (file1, file2) pairs over a process pool.
+    - At most `max_in_flight` pairs are submitted at a time, so big folders don't queue everything up front.
+    - A pair that raises is recorded as failed; a pair that kills its worker process is retried once
+      on a fresh pool and then recorded as failed, without stopping the rest of the batch.
+    """
+    def __init__(self, jobs=1, max_in_flight=None):
+        self.jobs = jobs if jobs and jobs > 0 else (os.cpu_count() or 1)
+        self.max_in_flight = max_in_flight or self.jobs * 2
+
+    def run(self, pairs, worker):
+        """
+        pairs: list of (f1, f2); worker: picklable callable worker(f1, f2) -> report path.
+        Returns result dicts in the order of `pairs`.
+        """
+        if self.jobs == 1:
+            return [run_timed(worker, f1, f2) for f1, f2 in pairs]
+
+        results = {}
+        attempts = {}
+        queue = list(range(len(pairs)))
+        queue.reverse() # pop() from the end keeps submission order
+
+        while queue:
+            executor = ProcessPoolExecutor(max_workers=self.jobs)
+            in_flight = {}
+            broken = False
+            try:
+                while queue or in_flight:
+                    while queue and len(in_flight) < self.max_in_flight:
+                        idx = queue.pop()
+                        attempts[idx] = attempts.get(idx, 0) + 1
+                        f1, f2 = pairs[idx]
+                        in_flight[executor.submit(run_timed, worker, f1, f2)] = idx
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        idx = in_flight.pop(fut)
+                        try:
+                            results[idx] = fut.result()
+                        except BrokenProcessPool:
+                            broken = True
+                            self.requeue_or_fail(idx, pairs, attempts, queue, results)
+                    if broken:
+                        # Every pair still in flight died with the pool
+                        for idx in in_flight.values():
+                            self.requeue_or_fail(idx, pairs, attempts, queue, results)
+                        in_flight = {}
+                        break
+            finally:
+                executor.shutdown(wait=not broken, cancel_futures=True)
+
+        return [results[i] for i in range(len(pairs))]
+
+    def requeue_or_fail(self, idx, pairs, attempts, queue, results):
+        if attempts.get(idx, 0) < 2:
+            queue.append(idx)
+            return
+        f1, f2 = pairs[idx]
+        results[idx] = {'file1': f1, 'file2': f2, 'status': 'failed', 'report': None,
+                        'error': 'worker process crashed', 'seconds': 0.0}
@@ -0,0 +1,77 @@
+
+import os
+import zlib
+import marshal
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "document-comparison", "extract")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+class ExtractionCache:
+    """
+    On-disk cache of extraction results (text, parsed tables, heading styles), content-addressed by
+    SHA-256 of the file bytes plus the extraction version, so renamed or same-named files in
+    different folders never collide. Entries are zlib-compressed marshal blobs; the least recently
+    used entries (by mtime, refreshed on every hit) are evicted once the directory exceeds max_bytes.
+    """
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.getenv("DOC_COMPARE_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    def key_for(self, file_path, version):
+        h = hashlib.sha256()
+        h.update(f"v{version}\0".encode())
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = marshal.loads(zlib.decompress(f.read()))
+            os.utime(path) # LRU: mark as recently used
+            return data
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            return None
+
+    def put(self, key, data):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            blob = zlib.compress(marshal.dumps(data), 6)
+            path = self.entry_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path) # Atomic, safe with parallel batch workers
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 缓存写入失败: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for e in it:
+                    if not e.name.endswith('.bin'): continue
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                    total += st.st_size
+        except OSError:
+            return
+
+        if total <= self.max_bytes: return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes: break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,69 @@
+
+import os
+import difflib
+import unicodedata
+
+from utils.assignment import solve_assignment
+
+class FilePairer:
+    """
+    Pairs files of two folders one-to-one by filename.
+    1. Character n-gram inverted index over folder 2 -> a short candidate list per file.
+    2. Candidates are scored with SequenceMatcher (only candidates, never all pairs).
+    3. A global assignment picks the best one-to-one pairing; leftovers are reported.
+    """
+    def __init__(self, n=2, min_ratio=0.4, max_candidates=10):
+        self.n = n
+        self.min_ratio = min_ratio
+        self.max_candidates = max_candidates
+
+    def normalize(self, path):
+        name = os.path.splitext(os.path.basename(path))[0]
+        return unicodedata.normalize('NFKC', name).lower()
+
+    def ngrams(self, s):
+        s = f" {s} "
+        if len(s) <= self.n: return {s}
+        return {s[i:i + self.n] for i in range(len(s) - self.n + 1)}
+
+    def pair(self, files1, files2):
+        """
+        Returns (pairs, unmatched1, unmatched2); pairs is a list of (f1, f2, score).
+        """
+        names1 = [self.normalize(f) for f in files1]
+        names2 = [self.normalize(f) for f in files2]
+        grams2 = [self.ngrams(n) for n in names2]
+
+        index = {}
+        for j, grams in enumerate(grams2):
+            for g in grams:
+                index.setdefault(g, []).append(j)
+
+        # Grams shared by most of a large folder (dates, "说明书", ...) don't discriminate
+        max_posting = max(50, len(files2) // 2)
+
+        scores = {}
+        for i, name in enumerate(names1):
+            grams = self.ngrams(name)
+            shared = {}
+            for g in grams:
+                posting = index.get(g)
+                if not posting or len(posting) > max_posting: continue
+                for j in posting:
+                    shared[j] = shared.get(j, 0) + 1
+
+            # Dice coefficient on n-grams ranks the candidates cheaply
+            ranked = sorted(shared.items(), key=lambda kv: -2.0 * kv[1] / (len(grams) + len(grams2[kv[0]])))
+            for j, _ in ranked[:self.max_candidates]:
+                ratio = difflib.SequenceMatcher(None, name, names2[j]).ratio()
+                if ratio > self.min_ratio:
+                    scores[(i, j)] = ratio
+
+        matches = solve_assignment(scores)
+        matched1 = {i for i, _, _ in matches}
+        matched2 = {j for _, j, _ in matches}
+
+        pairs = [(files1[i], files2[j], s) for i, j, s in matches]
+        unmatched1 = [f for i, f in enumerate(files1) if i not in matched1]
+        unmatched2 = [f for j, f in enumerate(files2) if j not in matched2]
+        return pairs, unmatched1, unmatched2
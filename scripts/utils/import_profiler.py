@@ -0,0 +1,80 @@
+
+import sys
+import time
+
+class _TimedLoader:
+    """
+    Wraps a module loader; exec_module is timed and nested imports are subtracted for the self time.
+    """
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        p = self.profiler
+        p.stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            nested = p.stack.pop()
+            if p.stack: p.stack[-1] += total
+            p.records.append((module.__name__, total - nested, total))
+
+class ImportProfiler:
+    """
+    Meta-path hook that records the import time of every module loaded after install(),
+    including modules imported lazily later in the run (jieba, openai).
+    records: [(module, self seconds, cumulative seconds)] in load order.
+    """
+    def __init__(self):
+        self.records = []
+        self.stack = []
+        self.installed = False
+
+    def install(self):
+        if not self.installed:
+            sys.meta_path.insert(0, self)
+            self.installed = True
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+        self.installed = False
+
+    def find_spec(self, name, path=None, target=None):
+        # Ask the remaining finders, then time whatever loader they return
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'): continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None: continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(spec.loader, self)
+            return spec
+        return None
+
+    def report(self, top=20):
+        lines = [f"⏱️ Import time: {len(self.records)} modules, {self.total():.3f}s"]
+        lines.append(f"  {'self ms':>9}  {'total ms':>9}  module")
+        for name, own, total in sorted(self.records, key=lambda r: -r[1])[:top]:
+            lines.append(f"  {own * 1000:9.1f}  {total * 1000:9.1f}  {name}")
+        # Per top-level package, so a heavy dependency shows up as one line
+        roots = {}
+        for name, own, _ in self.records:
+            root = name.split('.')[0]
+            roots[root] = roots.get(root, 0.0) + own
+        lines.append(f"  {'pkg ms':>9}  package")
+        for root, secs in sorted(roots.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"  {secs * 1000:9.1f}  {root}")
+        return "\n".join(lines)
+
+    def total(self):
+        return sum(own for _, own, _ in self.records)
@@ -0,0 +1,60 @@
+
+import os
+import json
+import hashlib
+
+class IncrementalState:
+    """
+    Results of the previous run of one document pair, keyed by content fingerprints.
+    Each stage stores its per-unit results (per table, per table pair, per section) in a bucket;
+    a unit whose fingerprint is unchanged reuses the stored result instead of being recomputed.
+    Only fingerprints used by the current run are written back, so the state never grows stale.
+    """
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.previous = {}
+        self.current = {}
+        self.hits = 0
+        self.misses = 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.previous = data.get('buckets', {})
+        except (OSError, ValueError):
+            pass
+
+    def fingerprint(self, obj):
+        raw = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, bucket, obj):
+        """
+        Returns (found, value) for a unit of work described by `obj`.
+        """
+        fp = self.fingerprint(obj)
+        stored = self.previous.get(bucket, {})
+        if fp in stored:
+            self.hits += 1
+            self.current.setdefault(bucket, {})[fp] = stored[fp]
+            return True, stored[fp]
+        self.misses += 1
+        return False, None
+
+    def put(self, bucket, obj, value):
+        self.current.setdefault(bucket, {})[self.fingerprint(obj)] = value
+
+    def memo(self, bucket, obj, compute):
+        found, value = self.get(bucket, obj)
+        if found: return value
+        value = compute()
+        self.put(bucket, obj, value)
+        return value
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'buckets': self.current}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
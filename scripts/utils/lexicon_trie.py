@@ -0,0 +1,146 @@
+
+INF = 1 << 30
+
+# Typos are looked for after an exact two-character anchor, with at most one edit in the
+# first PREFIX_LEN characters; this keeps the trie walk narrow on large lexicons
+PREFIX_LEN = 6
+PREFIX_BUDGET = 1
+
+# "北京分行" / "上海支行" are branches, not misspellings of 北京银行 / 上海银行
+BRANCH_SUFFIXES = ('分行', '支行')
+
+def is_branch_variant(found, term):
+    """
+    True when `found` is `term` with one "银行" turned into "分行" / "支行" and nothing else changed.
+    """
+    if len(found) != len(term): return False
+    diff = [k for k in range(len(term)) if found[k] != term[k]]
+    return len(diff) == 1 and term[diff[0]:diff[0] + 2] == '银行' and found[diff[0]:diff[0] + 2] in BRANCH_SUFFIXES
+
+def allowed_distance(n):
+    # Short terms are never fuzzy-matched: a one-character change makes a different real word
+    if n < 4: return 0
+    if n < 8: return 1
+    return 2
+
+class LexiconTrie:
+    """
+    Character trie over a domain lexicon, with approximate matching against running text.
+    Node layout: [children dict, term ending here or None, longest term length in the subtree].
+
+    scan() walks the text once. At every position whose first two characters start some term, the
+    trie is descended while a banded Levenshtein row (the edit-distance automaton state) is carried along:
+    row[j] = distance between the trie prefix and the next j text characters. Branches are pruned
+    as soon as the whole row exceeds the distance any term below them may have, so only a thin
+    slice of the trie is visited even for 100k+ entries.
+    """
+    def __init__(self, terms=()):
+        self.root = [{}, None, 0]
+        self.terms = {} # term -> insertion rank (earlier entries win ties)
+        for t in terms:
+            self.add(t)
+
+    def add(self, term):
+        term = term.strip()
+        if not term or term in self.terms: return
+        self.terms[term] = len(self.terms)
+        node = self.root
+        node[2] = max(node[2], len(term))
+        for ch in term:
+            nxt = node[0].get(ch)
+            if nxt is None:
+                nxt = [{}, None, 0]
+                node[0][ch] = nxt
+            node = nxt
+            node[2] = max(node[2], len(term))
+        node[1] = term
+
+    def __len__(self):
+        return len(self.terms)
+
+    def match_at(self, text, i, max_dist=2):
+        """
+        Terms matching text starting at i (first two characters exact).
+        Returns (exact_end, fuzzy): exact_end is the end of the longest exact match or -1;
+        fuzzy is the best near miss as (distance, end, term) or None.
+        """
+        first = self.root[0].get(text[i])
+        if first is None: return -1, None
+        exact_end = i + 1 if first[1] is not None else -1
+        second = first[0].get(text[i + 1]) if i + 1 < len(text) else None
+        if second is None: return exact_end, None
+
+        d = max_dist
+        window = text[i:i + second[2] + d]
+        width = len(window)
+        # Row for depth 2: the anchored two characters matched exactly
+        row = [INF] * (width + 1)
+        for j in range(0, min(width, 2 + d) + 1):
+            row[j] = abs(j - 2)
+
+        best = None
+        stack = [(second, 2, row)]
+        while stack:
+            node, depth, row = stack.pop()
+            term = node[1]
+            if term is not None:
+                if depth <= width and row[depth] == 0:
+                    exact_end = max(exact_end, i + depth)
+                else:
+                    limit = allowed_distance(len(term))
+                    lo, hi = max(1, depth - d), min(width, depth + d)
+                    for j in range(lo, hi + 1):
+                        dist = row[j]
+                        # A near miss never ends on punctuation or whitespace
+                        if 0 < dist <= limit and window[j - 1].isalnum():
+                            cand = (dist, -len(term), abs(j - depth), self.terms[term], i + j, term)
+                            if best is None or cand < best: best = cand
+            k = depth + 1
+            budget = PREFIX_BUDGET if k <= PREFIX_LEN else d
+            lo, hi = max(1, k - d), min(width, k + d)
+            children = node[0]
+            if min(row[max(0, depth - d):min(width, depth + d) + 1]) + 1 > budget:
+                # No edit left to spend: only children that match a text character in the band survive
+                children = {ch: children[ch] for ch in set(window[lo - 1:hi]) if ch in children}
+            for ch, child in children.items():
+                # Nothing below this child may be further away than its longest term allows
+                limit = min(allowed_distance(child[2]), budget)
+                new = [INF] * (width + 1)
+                new[0] = k
+                low = new[0] if lo == 1 else INF
+                for j in range(lo, hi + 1):
+                    cost = 0 if window[j - 1] == ch else 1
+                    v = row[j - 1] + cost
+                    if row[j] + 1 < v: v = row[j] + 1
+                    if new[j - 1] + 1 < v: v = new[j - 1] + 1
+                    new[j] = v
+                    if v < low: low = v
+                if low <= limit:
+                    stack.append((child, k, new))
+
+        if best is None: return exact_end, None
+        return exact_end, (best[0], best[4], best[5])
+
+    def scan(self, text, max_dist=2):
+        """
+        Yields (start, end, term, distance) for near misses of lexicon terms in text.
+        Positions covered by an exact lexicon match are never reported.
+        """
+        i, n = 0, len(text)
+        root = self.root[0]
+        while i < n:
+            if text[i] not in root:
+                i += 1
+                continue
+            exact_end, fuzzy = self.match_at(text, i, max_dist)
+            if exact_end > 0:
+                i = exact_end
+                continue
+            if fuzzy:
+                dist, end, term = fuzzy
+                found = text[i:end]
+                if found not in self.terms and not is_branch_variant(found, term):
+                    yield i, end, term, dist
+                    i = end
+                    continue
+            i += 1
@@ -0,0 +1,110 @@
+
+import re
+import unicodedata
+
+import numpy as np
+
+SHINGLE_BASE = np.uint64(1000003)
+EMPTY_SLOT = np.uint64((1 << 64) - 1) # Above any 32-bit hash value
+
+class MinHasher:
+    """
+    MinHash signatures of hashed token sets: num_perm multiply-shift hashes
+    (a * h + b mod 2^64) >> 32 with odd a, each keeping its minimum over the set. The share of
+    equal signature slots estimates the Jaccard similarity of two sets.
+    uint64 wraps around, so the whole family is one vectorized multiply-add (no modulo).
+    """
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    BLOCK = 8192 # Hashes per step, so a long section never builds a huge (len, num_perm) matrix
+
+    def signature(self, hashes):
+        """
+        hashes: int array of token hashes -> uint64 array of num_perm minima.
+        The empty set gets all-EMPTY_SLOT slots, see empty().
+        """
+        sig = np.full(self.num_perm, EMPTY_SLOT, dtype=np.uint64)
+        h = np.asarray(hashes)
+        h = h.view(np.uint64) if h.dtype == np.int64 else h.astype(np.uint64)
+        for lo in range(0, len(h), self.BLOCK):
+            block = h[lo:lo + self.BLOCK]
+            np.minimum(sig, ((block[:, None] * self.a[None, :] + self.b) >> np.uint64(32)).min(axis=0), out=sig)
+        return sig
+
+    def signatures(self, token_arrays):
+        """
+        One signature per token array -> (n, num_perm) uint64 matrix.
+        """
+        sigs = np.empty((len(token_arrays), self.num_perm), dtype=np.uint64)
+        for i, h in enumerate(token_arrays):
+            sigs[i] = self.signature(h)
+        return sigs
+
+    def empty(self, sigs):
+        # Rows that came from empty sets (their slots never compare as similar)
+        return (sigs == EMPTY_SLOT).all(axis=1)
+
+def shingles(text, k=5):
+    """
+    Hashed character k-shingles of a text (NFKC, whitespace dropped) -> sorted unique int64 array.
+    The k-character windows are hashed as a polynomial over the code points, all windows at once
+    (uint64 arithmetic wraps around). Texts shorter than k are one shingle.
+    """
+    text = re.sub(r'\s+', '', unicodedata.normalize('NFKC', text or ""))
+    if not text: return np.zeros(0, dtype=np.int64)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    k = min(k, len(codes))
+    n = len(codes) - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = h * SHINGLE_BASE + codes[j:j + n]
+    return np.unique(h.view(np.int64))
+
+def jaccard(h1, h2):
+    # Exact Jaccard of two sorted unique hash arrays
+    if not len(h1) or not len(h2): return 0.0
+    inter = len(np.intersect1d(h1, h2, assume_unique=True))
+    return inter / (len(h1) + len(h2) - inter)
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures: `bands` bands of num_perm / bands rows each.
+    Two sets share a bucket in some band with probability 1 - (1 - J^rows)^bands, so pairs above
+    roughly (1 / bands) ** (1 / rows) Jaccard become candidates and the rest are never compared.
+    Boilerplate (templated sections) would put everything in one bucket, so a bucket holds at
+    most `max_bucket` keys and a query returns at most `top_k` keys, the ones whose signatures
+    agree in the most slots.
+    """
+    def __init__(self, num_perm=64, bands=16, max_bucket=64, top_k=8):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_bucket = max_bucket
+        self.top_k = top_k
+        self.buckets = [{} for _ in range(bands)]
+        self.sigs = {}
+
+    def band_keys(self, sig):
+        r = self.rows
+        return [sig[b * r:(b + 1) * r].tobytes() for b in range(self.bands)]
+
+    def add(self, key, sig):
+        self.sigs[key] = sig
+        for band, bk in zip(self.buckets, self.band_keys(sig)):
+            bucket = band.setdefault(bk, [])
+            if len(bucket) < self.max_bucket:
+                bucket.append(key)
+
+    def query(self, sig):
+        found = set()
+        for band, bk in zip(self.buckets, self.band_keys(sig)):
+            found.update(band.get(bk, ()))
+        if len(found) <= self.top_k: return found
+        keys = list(found)
+        agree = (np.stack([self.sigs[k] for k in keys]) == sig[None, :]).sum(axis=1)
+        return {keys[k] for k in np.argsort(-agree, kind='stable')[:self.top_k]}
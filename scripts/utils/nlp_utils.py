@@ -1,11 +1,45 @@
 
+import os
 import re
-import jieba
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.minhash import MinHasher
+
+# jieba's prefix dictionary is built once and kept here as a marshal cache (not in /tmp, which is wiped)
+JIEBA_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "document-comparison", "jieba")
+
+_jieba = None
+
+def load_jieba():
+    """
+    Imports jieba on first use only; runs that never tokenize don't pay for it.
+    """
+    global _jieba
+    if _jieba is None:
+        import jieba
+        cache_dir = os.getenv("DOC_COMPARE_JIEBA_CACHE") or JIEBA_CACHE_DIR
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            jieba.dt.tmp_dir = cache_dir
+        except OSError:
+            pass # Fall back to jieba's own temp-dir cache
+        _jieba = jieba
+    return _jieba
 
 class NLPUtils:
-    def __init__(self):
-        # Initialize dictionary if needed
-        pass
+    """
+    Token-set similarity for names, headers and keys.
+    Token sets are cached (LRU, `cache_size` entries) as sorted unique int64 arrays of token
+    hashes, so a name compared again and again is cleaned and cut only once.
+    mode 'word': jieba tokens; mode 'char': character n-grams (no jieba needed).
+    """
+    def __init__(self, cache_size=4096, num_perm=64):
+        # jieba is loaded on the first tokenization, see load_jieba
+        self.cache_size = cache_size
+        self._tokens = OrderedDict()
+        self.minhasher = MinHasher(num_perm)
         
     def get_similarity(self, s1, s2):
         """
@@ -20,17 +54,81 @@ class NLPUtils:
         
         if s1 == s2: return 1.0
         
-        # 2. Tokenize
-        t1 = set(jieba.cut(s1))
-        t2 = set(jieba.cut(s2))
+        # 2. Tokenize (cached)
+        t1 = self.tokens(s1)
+        t2 = self.tokens(s2)
         
         # 3. Jaccard
-        intersection = len(t1 & t2)
-        union = len(t1 | t2)
+        intersection = len(np.intersect1d(t1, t2, assume_unique=True))
+        union = len(t1) + len(t2) - intersection
         
         if union == 0: return 0.0
         return intersection / union
 
+    def tokens(self, s, mode='word', n=2):
+        """
+        Hashed token set of a cleaned string: sorted unique int64 array.
+        """
+        key = (mode, n, s)
+        cached = self._tokens.get(key)
+        if cached is not None:
+            self._tokens.move_to_end(key)
+            return cached
+        
+        if mode == 'char':
+            toks = {s[i:i + n] for i in range(len(s) - n + 1)} if len(s) >= n else {s}
+            toks.discard("")
+        else:
+            toks = set(load_jieba().cut(s))
+        arr = np.unique(np.fromiter((hash(t) for t in toks), dtype=np.int64, count=len(toks)))
+        
+        self._tokens[key] = arr
+        if len(self._tokens) > self.cache_size:
+            self._tokens.popitem(last=False)
+        return arr
+
+    def similarity_matrix(self, list_a, list_b, method='jaccard', mode='word', n=2, chunk=256):
+        """
+        Similarity of every string in list_a to every string in list_b -> (len_a, len_b) float array.
+        method 'jaccard': exact, via token incidence matrices (intersection = A @ B.T).
+        method 'minhash': estimate from MinHash signatures, cheaper for long texts / big vocabularies.
+        Rows of list_a are processed `chunk` at a time to bound memory.
+        """
+        toks_a = [self.tokens(self.clean(s or ""), mode, n) for s in list_a]
+        toks_b = [self.tokens(self.clean(s or ""), mode, n) for s in list_b]
+        sim = np.zeros((len(toks_a), len(toks_b)))
+        if not toks_a or not toks_b: return sim
+        
+        if method == 'minhash':
+            sig_a = self.minhasher.signatures(toks_a)
+            sig_b = self.minhasher.signatures(toks_b)
+            empty_a = self.minhasher.empty(sig_a)
+            empty_b = self.minhasher.empty(sig_b)
+            for lo in range(0, len(toks_a), chunk):
+                block = sig_a[lo:lo + chunk]
+                sim[lo:lo + chunk] = (block[:, None, :] == sig_b[None, :, :]).mean(axis=2)
+            sim[empty_a, :] = 0.0
+            sim[:, empty_b] = 0.0
+            return sim
+        
+        # Token hashes -> column ids of one shared vocabulary
+        vocab = np.unique(np.concatenate(toks_a + toks_b))
+        def incidence(toks):
+            m = np.zeros((len(toks), len(vocab)), dtype=np.float32)
+            rows = np.repeat(np.arange(len(toks)), [len(t) for t in toks])
+            if len(rows):
+                m[rows, np.searchsorted(vocab, np.concatenate(toks))] = 1.0
+            return m
+        
+        inc_b = incidence(toks_b)
+        size_b = inc_b.sum(axis=1)
+        for lo in range(0, len(toks_a), chunk):
+            inc_a = incidence(toks_a[lo:lo + chunk])
+            inter = inc_a @ inc_b.T
+            union = inc_a.sum(axis=1)[:, None] + size_b[None, :] - inter
+            sim[lo:lo + chunk] = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+        return sim
+
     def clean(self, s):
         # Remove punctuation, bracket types, common corporation suffixes
         s = re.sub(r'[(),.（），。、]', '', s)
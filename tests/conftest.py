@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The code under test imports from scripts/ as its root (parsers, comparators, utils, reporters)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
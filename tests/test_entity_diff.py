@@ -0,0 +1,9 @@
+from comparators.entity_diff import EntityDiffer
+
+def test_figures_on_tabbed_prose_lines_are_compared():
+    a = "报告期末\t公司员工总数为1,200人。\n项目\t金额\n营业收入\t5,000万元"
+    b = "报告期末\t公司员工总数为1,300人。\n项目\t金额\n营业收入\t6,000万元"
+    aligned = [{'section': "员工情况", 'text_a': a, 'text_b': b, 'table_rows_a': [1, 2], 'table_rows_b': [1, 2]}]
+    conflicts = EntityDiffer().diff_aligned(aligned, [{'index': 0, 'status': 'modified'}])
+    # The table rows are left to the table comparison
+    assert [(c['key'], c['a'], c['b']) for c in conflicts] == [("公司员工总数", "1,200人", "1,300人")]
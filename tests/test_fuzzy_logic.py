@@ -0,0 +1,24 @@
+from comparators.fuzzy_logic import DataComparator
+
+def table(rows, headers=("合同名称", "合同金额", "签订日期", "备注")):
+    return {'headers': list(headers), 'rows': [dict(zip(headers, r)) for r in rows], 'pk': ["合同名称"]}
+
+def field_diffs(t1, t2):
+    diff = DataComparator().compare_table(t1, t2)
+    if not diff: return []
+    return [(r['key'], d['field'], d['v1'], d['v2']) for r in diff['row_diffs'] for d in r['diffs']]
+
+def test_dash_is_not_zero_in_amount_fields():
+    t1 = table([("采购合同", "-", "2021年3月1日", "无")])
+    t2 = table([("采购合同", "0", "2021年3月1日", "无")])
+    assert field_diffs(t1, t2) == [("采购合同", "合同金额", "-", "0")]
+
+def test_amounts_and_dates_compare_by_value():
+    t1 = table([("采购合同", "1,000.00", "2021年3月1日", "无")])
+    t2 = table([("采购合同", "1000", "2021.03.01", "无")])
+    assert field_diffs(t1, t2) == []
+
+def test_date_equivalence_only_applies_to_date_fields():
+    t1 = table([("采购合同", "100", "2021年3月1日", "2021年3月1日")])
+    t2 = table([("采购合同", "100", "2021年3月1日", "2021.03.01")])
+    assert field_diffs(t1, t2) == [("采购合同", "备注", "2021年3月1日", "2021.03.01")]
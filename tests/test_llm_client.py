@@ -0,0 +1,113 @@
+import re
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("openai")
+
+from comparators.llm_client import LLMClient
+
+class FakeServer:
+    """
+    OpenAI-compatible /v1/chat/completions on 127.0.0.1.
+    The first attempt of section "S1" gets 429 with Retry-After, the first of "S2" a 500.
+    """
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.attempts = {} # section -> [monotonic time of each request]
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                section = re.search(r'“(S\d+)”', body['messages'][-1]['content']).group(1)
+                with server.lock:
+                    times = server.attempts.setdefault(section, [])
+                    times.append(time.monotonic())
+                    first = len(times) == 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.delay)
+                    if first and section == "S1":
+                        self.reply(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0.3"})
+                    elif first and section == "S2":
+                        self.reply(500, {"error": {"message": "boom"}})
+                    else:
+                        content = json.dumps({"has_diff": True, "summary": f"{section} 有差异", "details": []}, ensure_ascii=False)
+                        self.reply(200, {
+                            "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": body['model'],
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": content}}],
+                        })
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def requests(self):
+        return sum(len(t) for t in self.attempts.values())
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    srv = FakeServer()
+    srv.thread.start()
+    monkeypatch.setenv("LLM_API_KEY", "test")
+    monkeypatch.setenv("LLM_BASE_URL", srv.url)
+    monkeypatch.setenv("LLM_CONCURRENCY", "2")
+    monkeypatch.setenv("LLM_RPS", "1000")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    monkeypatch.setenv("LLM_CACHE", "on")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    yield srv
+    srv.httpd.shutdown()
+    srv.httpd.server_close()
+
+def sections(n=6):
+    return [{'section': f"S{k}", 'text_a': f"第{k}节：金额为{k}00万元。", 'text_b': f"第{k}节：金额为{k}50万元。"}
+            for k in range(n)]
+
+def test_concurrency_retry_and_cache(server):
+    insights = LLMClient().compare_aligned(sections())
+    assert sorted(i['section'] for i in insights) == [f"S{k}" for k in range(6)]
+
+    # Never more requests in flight than LLM_CONCURRENCY
+    assert 1 < server.max_in_flight <= 2
+
+    # 429 and 500 are retried once; the 429 retry waits for Retry-After
+    assert len(server.attempts["S1"]) == 2
+    assert len(server.attempts["S2"]) == 2
+    assert server.attempts["S1"][1] - server.attempts["S1"][0] >= 0.3
+    assert all(len(server.attempts[f"S{k}"]) == 1 for k in (0, 3, 4, 5))
+
+    # Second run: every section comes from the local cache, nothing is sent
+    sent = server.requests()
+    again = LLMClient().compare_aligned(sections())
+    assert server.requests() == sent
+    assert sorted(i['section'] for i in again) == sorted(i['section'] for i in insights)
@@ -0,0 +1,48 @@
+import zipfile
+
+import pytest
+
+from parsers.office_parser import OfficeParser, DocumentReadError
+from utils.batch_runner import BatchRunner
+
+def write_docx(path, body):
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('word/document.xml', body)
+
+def test_not_a_zip_raises(tmp_path):
+    path = tmp_path / "bad.docx"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(DocumentReadError):
+        OfficeParser().parse(str(path))
+
+def test_missing_body_raises(tmp_path):
+    path = tmp_path / "empty.docx"
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('word/styles.xml', "<styles/>")
+    with pytest.raises(DocumentReadError):
+        OfficeParser().parse(str(path))
+
+def test_truncated_body_raises(tmp_path):
+    path = tmp_path / "truncated.docx"
+    W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    write_docx(path, f'<w:document xmlns:w="{W}"><w:body><w:p><w:r><w:t>正文')
+    with pytest.raises(DocumentReadError):
+        OfficeParser().parse(str(path))
+
+def test_batch_records_unreadable_pair_as_failed(tmp_path):
+    path = tmp_path / "bad.docx"
+    path.write_bytes(b"not a zip")
+    results = BatchRunner(jobs=1).run([(str(path), str(path))], lambda f1, f2: OfficeParser().parse(f1))
+    assert results[0]['status'] == 'failed'
+    assert "DocumentReadError" in results[0]['error']
+
+def test_tab_stops_are_not_text(tmp_path):
+    path = tmp_path / "tabs.docx"
+    W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+    tabs = '<w:pPr><w:tabs><w:tab w:val="left" w:pos="2100"/><w:tab w:val="left" w:pos="4200"/></w:tabs></w:pPr>'
+    write_docx(path, f'<w:document xmlns:w="{W}"><w:body>'
+                     f'<w:p>{tabs}<w:r><w:t>公司注册资本为5,000万元。</w:t></w:r></w:p>'
+                     f'<w:p>{tabs}<w:r><w:t>发行人</w:t><w:tab/><w:t>指</w:t></w:r><w:r><w:tab/><w:t>本公司</w:t></w:r></w:p>'
+                     '</w:body></w:document>')
+    doc = OfficeParser().parse(str(path))
+    assert [p['text'] for p in doc.paragraphs] == ["公司注册资本为5,000万元。", "发行人\t指\t本公司"]
@@ -0,0 +1,18 @@
+import random
+
+from comparators.row_aligner import RowAligner
+
+def test_fuzzy_keys_and_duplicates():
+    keys1 = ["甲公司", "乙公司（北京）", "丙有限公司", "甲公司"]
+    keys2 = ["乙公司(北京)", "甲公司", "丙有限责任公司", "甲公司"]
+    pairs, only1, only2 = RowAligner().align(keys1, keys2)
+    assert [(i, j) for i, j, _ in pairs] == [(0, 1), (1, 0), (2, 2), (3, 3)]
+    assert only1 == only2 == []
+
+def test_common_prefix_keys_are_blocked_but_still_matched():
+    rng = random.Random(7)
+    keys1 = [f"ZL2019{rng.randint(10 ** 6, 10 ** 7)}.{rng.randint(0, 9)}" for _ in range(3000)]
+    keys2 = [k[:-3] + "X" + k[-2:] for k in keys1] # every key differs slightly, nothing joins exactly
+    aligner = RowAligner(max_posting=64)
+    pairs, _, _ = aligner.align(keys1, keys2)
+    assert sum(1 for i, j, _ in pairs if i == j) >= 2990
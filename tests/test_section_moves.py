@@ -0,0 +1,49 @@
+from parsers.section_chunker import SectionChunker
+from parsers.section_moves import MoveDetector
+from utils.minhash import MinHasher, LSHIndex, shingles
+
+PARA = "公司与关联方之间的采购交易均按照市场价格定价，交易价格公允，不存在通过关联交易输送利益的情形。"
+
+def test_moved_section_is_paired_with_its_new_chapter():
+    a = f"一、关联交易\n（一）采购定价\n{PARA}\n二、同业竞争\n（一）承诺\n控股股东出具了避免同业竞争的承诺函。\n"
+    b = f"一、关联交易\n二、同业竞争\n（一）承诺\n控股股东出具了避免同业竞争的承诺函。\n（二）采购定价说明\n{PARA}已履行审议程序。\n"
+    chunker = SectionChunker()
+    root_a, root_b = chunker.build_tree(a), chunker.build_tree(b)
+    aligned = MoveDetector().detect(chunker.align_trees(root_a, root_b), root_a, root_b)
+    moved = [s for s in aligned if s.get('match')]
+    assert len(moved) == 1
+    assert moved[0]['match'] == 'moved'
+    assert (moved[0]['moved_from'], moved[0]['moved_to']) == ("一、关联交易", "二、同业竞争")
+    assert moved[0]['header_b'] == "（二）采购定价说明"
+
+def test_templated_sections_are_capped_and_still_paired():
+    tpl = "本公司与{n}号关联方签订的采购合同已经董事会审议通过，交易价格参照市场价格确定，交易公允。"
+    n = 300
+    aligned = [{'section': f"a{i}", 'text_a': tpl.format(n=i), 'text_b': ''} for i in range(n)]
+    aligned += [{'section': f"b{i}", 'text_a': '', 'text_b': tpl.format(n=i) + "已披露。"} for i in range(n)]
+    out = MoveDetector().detect(aligned)
+    moved = [s for s in out if s.get('match')]
+    assert len(moved) >= n * 0.95
+    assert all(s['section'][1:] == s['header_b'][1:] for s in moved)
+
+def test_lsh_query_returns_at_most_top_k():
+    hasher = MinHasher()
+    index = LSHIndex(top_k=5, max_bucket=10)
+    sig = hasher.signature(shingles(PARA))
+    for k in range(50):
+        index.add(k, sig)
+    assert len(index.query(sig)) <= 5
+    assert all(len(bucket) <= 10 for band in index.buckets for bucket in band.values())
+
+def test_shared_table_does_not_pair_unrelated_sections():
+    rows = ["交易对方\t交易内容\t2021年度\t2022年度", "甲公司\t采购原材料\t1,234.56\t2,345.67",
+            "乙公司\t采购设备及配件\t3,456.78\t4,567.89", "丙公司\t接受劳务服务\t567.89\t678.90"]
+    a = ["一、关联交易", "（一）采购定价", PARA, *rows, "二、同业竞争", "（一）承诺", "控股股东出具了避免同业竞争的承诺函。"]
+    b = ["一、关联交易", *rows, "二、同业竞争", "（一）承诺", "控股股东出具了避免同业竞争的承诺函。",
+         "（二）采购定价说明", PARA + "已履行审议程序。"]
+    chunker = SectionChunker()
+    root_a = chunker.build_tree("\n".join(a), None, {n for n, l in enumerate(a) if '\t' in l})
+    root_b = chunker.build_tree("\n".join(b), None, {n for n, l in enumerate(b) if '\t' in l})
+    aligned = MoveDetector().detect(chunker.align_trees(root_a, root_b), root_a, root_b)
+    moved = [s for s in aligned if s.get('match')]
+    assert [(s['section'], s['header_b']) for s in moved] == [("（一）采购定价", "（二）采购定价说明")]
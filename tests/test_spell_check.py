@@ -0,0 +1,24 @@
+import pytest
+
+from comparators.spell_check import SpellChecker
+
+def near_misses(text):
+    return [(text[s:e], term) for s, e, term, _ in SpellChecker().trie.scan(text)]
+
+@pytest.mark.parametrize("text", [
+    "招商银行北京分行",
+    "中信银行南京分行",
+    "中信银行宁波分行",
+    "中国银行江苏分行",
+    "广发银行上海分行",
+    "交通银行上海支行",
+    "借款人已在兴业银行北京分行、中信银行南京分行开立账户。",
+])
+def test_branch_names_are_not_typos(text):
+    assert near_misses(text) == []
+
+def test_missing_character_is_still_reported():
+    assert [term for _, term in near_misses("中国银深圳分行提供贷款")] == ["中国银行"]
+
+def test_misspelled_long_name_is_reported():
+    assert near_misses("经中国证券监督管理委会核准") == [("中国证券监督管理委会", "中国证券监督管理委员会")]
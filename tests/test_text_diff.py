@@ -0,0 +1,31 @@
+from comparators.text_diff import TextDiffer
+from parsers.office_parser import OfficeDocument
+from parsers.section_chunker import SectionChunker
+
+def document(paragraphs, table):
+    # Heading, paragraphs, then one table
+    paras = [{'text': "（一）基本情况", 'style': '', 'level': 0}] + [{'text': t, 'style': '', 'level': 0} for t in paragraphs]
+    blocks = [('p', i) for i in range(len(paras))] + [('t', 0)]
+    return OfficeDocument("x.docx", paras, [table], blocks)
+
+def diff_documents(doc_a, doc_b):
+    chunker = SectionChunker()
+    root_a = chunker.build_tree(doc_a.text, None, doc_a.table_lines)
+    root_b = chunker.build_tree(doc_b.text, None, doc_b.table_lines)
+    return TextDiffer().diff_aligned(chunker.align_trees(root_a, root_b))
+
+def test_table_rows_and_width_variants_are_not_prose_changes():
+    a = document(["公司注册资本5000万元（人民币）。"], [["项目", "2021年", "2022年"], ["收入", "5000", "6000"]])
+    b = document(["公司注册资本5000万元(人民币)。"], [["项目", "2021年", "2022年"], ["收入", "5000", "7000"]])
+    assert diff_documents(a, b) == []
+
+def test_prose_with_tabs_is_still_compared():
+    table = [["项目", "金额"]]
+    a = document(["发行人\t指\t深圳市甲科技股份有限公司", "公司注册资本为5,000万元。"], table)
+    b = document(["发行人\t指\t深圳市乙科技股份有限公司", "公司注册资本为6,000万元。"], table)
+    ops = diff_documents(a, b)[0]['ops']
+    assert [(o['a'], o['b'], o['line_a']) for o in ops] == [("甲", "乙", 0), ("5,000", "6,000", 1)]
+
+def test_number_change_is_reported_as_whole_token():
+    ops = TextDiffer().diff_texts("公司注册资本5000万元。", "公司注册资本5100万元。")
+    assert [(o['op'], o['a'], o['b']) for o in ops] == [('replace', '5000', '5100')]